@@ -5,6 +5,7 @@ from django.http import JsonResponse
 from django.db import models
 from django.db.models import Count, Exists, OuterRef
 from django.core.paginator import Paginator
+from productos.services.image_service import ImageService
 from .models import Blog, Comentario
 
 # vistas del blog
@@ -44,6 +45,8 @@ def listado_blog(request):
         'categoria_actual': categoria,
         'mensaje': 'Ideas para ti',
         'page_obj': page_obj,
+        # Versiones reducidas de las imágenes de la página en una sola consulta
+        'variantes': ImageService.variantes_many(blog.imagen.name for blog in page_obj),
     })
 
 def detalle_blog(request, blog_id):
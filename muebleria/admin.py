@@ -0,0 +1,28 @@
+from django.contrib import admin
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Trabajo
+
+
+@admin.register(Trabajo)
+class TrabajoAdmin(admin.ModelAdmin):
+    list_display = ('id', 'tipo', 'estado', 'intentos', 'fecha_creacion', 'fecha_fin')
+    list_filter = ('estado', 'tipo')
+    readonly_fields = ('tipo', 'datos', 'intentos', 'error', 'fecha_creacion', 'fecha_inicio', 'fecha_fin')
+    actions = ['reintentar']
+
+    def reintentar(self, request, queryset):
+        """Vuelve a encolar los trabajos con error."""
+        cantidad = 0
+        for trabajo in queryset.filter(estado=Trabajo.ERROR):
+            try:
+                with transaction.atomic():
+                    Trabajo.objects.filter(pk=trabajo.pk).update(
+                        estado=Trabajo.PENDIENTE, intentos=0, disponible_desde=timezone.now(),
+                    )
+            except IntegrityError:
+                continue  # ya hay uno igual pendiente o en proceso
+            cantidad += 1
+        self.message_user(request, f'{cantidad} trabajos encolados de nuevo.')
+    reintentar.short_description = 'Reintentar trabajos con error'
@@ -0,0 +1,173 @@
+"""
+Cache en disco local de los archivos del almacenamiento de media
+"""
+import datetime
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+
+from muebleria.content_storage import ContenidoMixin
+
+
+class CacheMedia:
+    """
+    Acceso a archivos de media desde el servidor (adjuntos, procesamiento
+    de imágenes) sin depender de storage.path(), que no existe en Azure.
+    Con almacenamiento local abre el archivo directamente; con uno remoto
+    lo descarga por partes a un directorio local la primera vez y después
+    lo lee de disco. La copia se identifica por nombre y versión (ETag; los
+    nombres por contenido no cambian nunca) y el directorio se limita a
+    `max_bytes` borrando los menos usados.
+    """
+
+    CHUNK = 1024 * 1024
+
+    def __init__(self, storage=None, directorio=None, max_bytes=None):
+        self._storage = storage
+        self.directorio = str(directorio or settings.MEDIA_CACHE_DIR)
+        self.max_bytes = max_bytes if max_bytes is not None else settings.MEDIA_CACHE_MAX_BYTES
+
+    @property
+    def storage(self):
+        return self._storage or default_storage
+
+    def _ruta_local(self, nombre):
+        """ruta del archivo en el almacenamiento si es local, None si es remoto"""
+        try:
+            return self.storage.path(nombre)
+        except NotImplementedError:
+            return None
+
+    def _version(self, nombre):
+        if ContenidoMixin.es_de_contenido(nombre):
+            return 'contenido'
+        cliente = getattr(self.storage, 'client', None)
+        if cliente is not None:
+            from azure.core.exceptions import ResourceNotFoundError
+            try:
+                blob = cliente.get_blob_client(self.storage._get_valid_path(nombre))
+                return blob.get_blob_properties().etag
+            except ResourceNotFoundError:
+                raise FileNotFoundError(nombre)
+        if not self.storage.exists(nombre):
+            raise FileNotFoundError(nombre)
+        return self.storage.get_modified_time(nombre).isoformat()
+
+    def metadatos(self, nombre):
+        """(tamaño, fecha de modificación, ETag) sin descargar el archivo"""
+        ruta = self._ruta_local(nombre)
+        if ruta is not None:
+            estado = os.stat(ruta)
+            modificado = datetime.datetime.fromtimestamp(estado.st_mtime, tz=datetime.timezone.utc)
+            return estado.st_size, modificado, f'"{estado.st_size:x}-{estado.st_mtime_ns:x}"'
+        cliente = getattr(self.storage, 'client', None)
+        if cliente is not None:
+            from azure.core.exceptions import ResourceNotFoundError
+            try:
+                blob = cliente.get_blob_client(self.storage._get_valid_path(nombre))
+                propiedades = blob.get_blob_properties()
+            except ResourceNotFoundError:
+                raise FileNotFoundError(nombre)
+            return propiedades.size, propiedades.last_modified, propiedades.etag
+        if not self.storage.exists(nombre):
+            raise FileNotFoundError(nombre)
+        tamano = self.storage.size(nombre)
+        modificado = self.storage.get_modified_time(nombre)
+        return tamano, modificado, f'"{tamano:x}-{int(modificado.timestamp()):x}"'
+
+    def _partes(self, nombre):
+        """contenido remoto por partes, sin cargarlo entero en memoria"""
+        cliente = getattr(self.storage, 'client', None)
+        if cliente is not None:
+            blob = cliente.get_blob_client(self.storage._get_valid_path(nombre))
+            yield from blob.download_blob().chunks()
+            return
+        with self.storage.open(nombre, 'rb') as archivo:
+            yield from archivo.chunks(self.CHUNK)
+
+    def open(self, nombre, mode='rb'):
+        """
+        Archivo abierto con el contenido actual de `nombre`. Se abre antes de
+        recortar el directorio: si otro proceso borra la copia después, el
+        archivo abierto se sigue leyendo completo.
+        """
+        pendiente = getattr(self.storage, 'ruta_pendiente', None)
+        ruta = pendiente(nombre) if pendiente else None
+        if ruta is not None:
+            try:
+                return open(ruta, mode)  # subida diferida que todavía no se hizo
+            except FileNotFoundError:
+                pass  # se subió recién
+        ruta = self._ruta_local(nombre)
+        if ruta is not None:
+            return open(ruta, mode)
+
+        clave = hashlib.sha1(f'{nombre}\0{self._version(nombre)}'.encode()).hexdigest()
+        ruta = os.path.join(self.directorio, clave[:2], clave + os.path.splitext(nombre)[1].lower())
+        try:
+            archivo = open(ruta, mode)
+        except FileNotFoundError:
+            pass  # no está o la borró un recorte: se descarga de nuevo
+        else:
+            try:
+                os.utime(ruta)  # la fecha de modificación marca el último uso
+            except FileNotFoundError:
+                pass
+            return archivo
+
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        # Se descarga a un temporal y se renombra: otro proceso nunca ve un archivo a medias
+        descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix='.descarga')
+        try:
+            with os.fdopen(descriptor, 'wb') as destino:
+                for parte in self._partes(nombre):
+                    destino.write(parte)
+            archivo = open(temporal, mode)
+        except BaseException:
+            os.unlink(temporal)
+            raise
+        try:
+            os.replace(temporal, ruta)
+        except BaseException:
+            archivo.close()
+            os.unlink(temporal)
+            raise
+        # Nunca se borra lo recién descargado, aunque solo supere max_bytes
+        self.recortar(conservar=ruta)
+        return archivo
+
+    def recortar(self, conservar=None):
+        """
+        borra los archivos usados hace más tiempo hasta quedar bajo
+        max_bytes, salvo `conservar`
+        """
+        archivos = []
+        total = 0
+        for carpeta, _, nombres in os.walk(self.directorio):
+            for nombre in nombres:
+                if nombre.endswith('.descarga'):
+                    continue  # descarga en curso
+                ruta = os.path.join(carpeta, nombre)
+                try:
+                    estado = os.stat(ruta)
+                except FileNotFoundError:
+                    continue
+                total += estado.st_size
+                if ruta != conservar:
+                    archivos.append((estado.st_mtime, estado.st_size, ruta))
+        if total <= self.max_bytes:
+            return
+        for _, tamano, ruta in sorted(archivos):
+            try:
+                os.unlink(ruta)
+            except FileNotFoundError:
+                pass
+            total -= tamano
+            if total <= self.max_bytes * 0.9:
+                break
+
+
+cache_media = CacheMedia()
@@ -0,0 +1,227 @@
+"""
+Almacenamiento direccionado por contenido para los archivos subidos
+"""
+import hashlib
+import os
+import tempfile
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+
+from muebleria.trabajos import Tarea
+
+PREFIJO = 'contenido'
+
+
+def referencias_media(clase_campo=models.FileField):
+    """
+    {nombre de archivo: [(modelo, campo, pk), ...]} de los campos
+    `clase_campo` (FileField, ImageField) de todos los modelos, sin
+    ImagenDerivada: sus archivos salen de la imagen original y se tratan
+    junto con ella.
+    """
+    from productos.models import ImagenDerivada
+    referencias = defaultdict(list)
+    for modelo in apps.get_models():
+        if modelo is ImagenDerivada:
+            continue
+        campos = [campo.name for campo in modelo._meta.get_fields() if isinstance(campo, clase_campo)]
+        for campo in campos:
+            filas = modelo._default_manager.exclude(**{campo: ''}).exclude(**{f'{campo}__isnull': True})
+            for pk, nombre in filas.values_list('pk', campo).iterator():
+                referencias[nombre].append((modelo, campo, pk))
+    return referencias
+
+
+class ContenidoMixin:
+    """
+    Guarda cada archivo con un nombre derivado del SHA-256 de sus bytes
+    (contenido/ab/abcdef....png): los mismos bytes subidos varias veces se
+    guardan una sola vez. ArchivoMedia lleva cuántas veces se guardó cada
+    uno y delete() solo borra el archivo cuando no quedan referencias.
+    Los nombres que no son de contenido (archivos previos) se borran como
+    siempre.
+    """
+
+    # Lo que lanza _save() cuando el archivo ya existe y no se sobrescribe
+    ERRORES_YA_EXISTE = (FileExistsError,)
+
+    @staticmethod
+    def calcular_hash(content):
+        digest = hashlib.sha256()
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        return digest.hexdigest()
+
+    @staticmethod
+    def nombre_contenido(sha256, name):
+        extension = os.path.splitext(name or '')[1].lower()
+        return f'{PREFIJO}/{sha256[:2]}/{sha256}{extension}'
+
+    @staticmethod
+    def es_de_contenido(name):
+        return bool(name) and name.startswith(f'{PREFIJO}/')
+
+    def agregar_referencia(self, name):
+        """
+        suma una referencia a un archivo ya guardado; False si no existe o
+        si tiene un borrado pendiente (0 referencias, ver delete)
+        """
+        from muebleria.models import ArchivoMedia
+        return ArchivoMedia.objects.filter(nombre=name, referencias__gt=0).update(
+            referencias=F('referencias') + 1,
+        ) > 0
+
+    def _escribir(self, nombre, content):
+        """
+        escribe el archivo con su nombre exacto. Si otro proceso lo escribió
+        al mismo tiempo queda ese (son los mismos bytes): el error de archivo
+        existente se ignora y una copia con nombre alternativo se borra
+        """
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        try:
+            guardado = self._save(nombre, content)
+        except self.ERRORES_YA_EXISTE:
+            return
+        if guardado != nombre:
+            super().delete(guardado)
+
+    def save(self, name, content, max_length=None):
+        from muebleria.models import ArchivoMedia
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        sha256 = self.calcular_hash(content)
+        nombre = self.nombre_contenido(sha256, name)
+        if self.agregar_referencia(nombre):
+            return nombre
+        with transaction.atomic():
+            archivo = ArchivoMedia.objects.select_for_update().filter(nombre=nombre).first()
+            if archivo is not None:
+                if archivo.referencias == 0 and not self.exists(nombre):
+                    # Borrado pendiente: con el candado tomado el borrado ya
+                    # no lo toca; solo se escribe si ya no estaba
+                    self._escribir(nombre, content)
+                archivo.referencias += 1
+                archivo.save(update_fields=['referencias'])
+                return nombre
+        # Sin registro no hay borrado pendiente: si el archivo existe es estable
+        if not self.exists(nombre):
+            self._escribir(nombre, content)
+        try:
+            with transaction.atomic():
+                ArchivoMedia.objects.create(nombre=nombre, sha256=sha256, tamano=content.size, referencias=1)
+        except IntegrityError:
+            # Otro proceso lo registró al mismo tiempo
+            return self.save(name, content, max_length)
+        return nombre
+
+    def ruta_pendiente(self, name):
+        """ruta local de `name` si todavía espera su subida (ver reservar), o None"""
+        if not self.es_de_contenido(name):
+            return None
+        ruta = os.path.join(settings.SUBIDAS_PENDIENTES_DIR, name)
+        return ruta if os.path.exists(ruta) else None
+
+    def reservar(self, name, content):
+        """
+        Como save(), pero sin escribir en el almacenamiento: suma la
+        referencia, deja el archivo en SUBIDAS_PENDIENTES_DIR y encola su
+        subida (tarea_subida) para cuando se confirme la transacción. Hasta
+        que el worker lo sube la URL no responde; cache_media y las
+        derivadas leen la copia local.
+        """
+        from muebleria.models import ArchivoMedia
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        sha256 = self.calcular_hash(content)
+        nombre = self.nombre_contenido(sha256, name)
+        with transaction.atomic():
+            archivo, _ = ArchivoMedia.objects.select_for_update().get_or_create(
+                nombre=nombre, defaults={'sha256': sha256, 'tamano': content.size},
+            )
+            escrito = archivo.referencias > 0
+            archivo.referencias += 1
+            archivo.save(update_fields=['referencias'])
+        if escrito:
+            return nombre  # ya guardado (o con su subida en curso)
+
+        ruta = os.path.join(settings.SUBIDAS_PENDIENTES_DIR, nombre)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix='.parcial')
+        try:
+            with os.fdopen(descriptor, 'wb') as destino:
+                for chunk in content.chunks():
+                    destino.write(chunk)
+            os.replace(temporal, ruta)
+        except BaseException:
+            os.unlink(temporal)
+            raise
+        tarea_subida.encolar(nombre=nombre)
+        return nombre
+
+    def subir_pendiente(self, name):
+        """sube la copia local que dejó reservar() y la borra"""
+        from muebleria.models import ArchivoMedia
+        ruta = self.ruta_pendiente(name)
+        if ruta is None:
+            return  # ya se subió
+        with transaction.atomic():
+            # Con el candado, un borrado pendiente (0 referencias) no corre a la vez
+            archivo = ArchivoMedia.objects.select_for_update().filter(nombre=name, referencias__gt=0).first()
+            if archivo is not None and not self.exists(name):
+                with open(ruta, 'rb') as local:
+                    self._escribir(name, File(local, name))
+        os.unlink(ruta)
+
+    def delete(self, name):
+        """
+        Resta una referencia. El archivo se borra recién cuando se confirma
+        la transacción (si se revierte, el archivo sigue ahí) y solo si
+        nadie volvió a guardarlo mientras tanto.
+        """
+        from muebleria.models import ArchivoMedia
+        if not self.es_de_contenido(name):
+            return super().delete(name)
+        with transaction.atomic():
+            archivo = ArchivoMedia.objects.select_for_update().filter(nombre=name).first()
+            if archivo is None:
+                return super().delete(name)  # archivo sin registrar
+            if archivo.referencias > 0:
+                archivo.referencias -= 1
+                archivo.save(update_fields=['referencias'])
+            if archivo.referencias > 0:
+                return
+        transaction.on_commit(lambda: self._borrar_sin_referencias(name))
+
+    def _borrar_sin_referencias(self, name):
+        from muebleria.models import ArchivoMedia
+        with transaction.atomic():
+            # El candado sobre la fila ordena este borrado con save()
+            archivo = ArchivoMedia.objects.select_for_update().filter(nombre=name, referencias=0).first()
+            if archivo is None:
+                return  # se volvió a guardar
+            super().delete(name)
+            archivo.delete()
+
+
+class ContenidoFileSystemStorage(ContenidoMixin, FileSystemStorage):
+    """MEDIA_ROOT local con nombres por contenido"""
+
+
+def _subir_pendiente(datos):
+    default_storage.subir_pendiente(datos['nombre'])
+
+
+tarea_subida = Tarea('muebleria.content_storage.tarea_subida', _subir_pendiente)
@@ -1,8 +1,10 @@
 """
 Custom storage backends for Azure Blob Storage
 """
+from azure.core.exceptions import ResourceExistsError
 from django.conf import settings
 from storages.backends.azure_storage import AzureStorage
+from muebleria.content_storage import ContenidoMixin
 import os
 
 class AzureMediaStorage(AzureStorage):
@@ -13,6 +15,11 @@ class AzureMediaStorage(AzureStorage):
     file_overwrite = False
     custom_domain = f"{account_name}.blob.core.windows.net" if account_name else None
 
+class ContenidoAzureMediaStorage(ContenidoMixin, AzureMediaStorage):
+    """AzureMediaStorage con nombres por contenido (deduplica subidas)"""
+    # file_overwrite = False: upload_blob(overwrite=False) falla si el blob ya existe
+    ERRORES_YA_EXISTE = (FileExistsError, ResourceExistsError)
+
 class AzureStaticStorage(AzureStorage):
     account_name = os.environ.get('AZURE_STORAGE_ACCOUNT_NAME')
     account_key = os.environ.get('AZURE_STORAGE_ACCOUNT_KEY')
@@ -0,0 +1,90 @@
+"""
+Pasa los archivos existentes al almacenamiento por contenido y junta los duplicados
+"""
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from muebleria.content_storage import ContenidoMixin, referencias_media
+
+
+class Command(BaseCommand):
+    help = 'Renombra los archivos subidos por su hash de contenido y junta los duplicados'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo muestra cuántos archivos y bytes se ahorrarían',
+        )
+        parser.add_argument(
+            '--borrar-originales',
+            action='store_true',
+            help='Borra los archivos con el nombre anterior una vez actualizados los registros',
+        )
+
+    def handle(self, *args, **options):
+        storage = default_storage
+        if not isinstance(storage, ContenidoMixin):
+            self.stdout.write(self.style.ERROR('El almacenamiento por defecto no es por contenido (STORAGES)'))
+            return
+
+        # Las derivadas se regeneran desde la imagen original (ver _mover_derivadas)
+        referencias = {
+            nombre: filas for nombre, filas in referencias_media().items()
+            if not ContenidoMixin.es_de_contenido(nombre)
+        }
+        nuevos = {}
+        tamanos = {}
+        faltantes = 0
+        for nombre in referencias:
+            if not storage.exists(nombre):
+                faltantes += 1
+                continue
+            with storage.open(nombre, 'rb') as archivo:
+                sha256 = ContenidoMixin.calcular_hash(archivo)
+                tamanos[nombre] = archivo.size
+            nuevos[nombre] = ContenidoMixin.nombre_contenido(sha256, nombre)
+
+        por_contenido = {nuevo: tamanos[nombre] for nombre, nuevo in nuevos.items()}
+        ahorro = sum(tamanos.values()) - sum(por_contenido.values())
+        self.stdout.write(
+            f'{len(nuevos)} archivos, {len(por_contenido)} contenidos distintos, '
+            f'{ahorro / 1024 / 1024:.1f} MB duplicados, {faltantes} no encontrados'
+        )
+        if options['dry_run']:
+            return
+
+        for nombre, nuevo in nuevos.items():
+            filas = referencias[nombre]
+            # Una referencia por fila que apunta al archivo
+            if not storage.agregar_referencia(nuevo):
+                with storage.open(nombre, 'rb') as archivo:
+                    storage.save(nombre, archivo)  # guarda como `nuevo` con 1 referencia
+            for _ in filas[1:]:
+                storage.agregar_referencia(nuevo)
+            for modelo, campo, pk in filas:
+                # update(): sin señales ni auto_now
+                modelo._default_manager.filter(pk=pk).update(**{campo: nuevo})
+            self._mover_derivadas(nombre, nuevo)
+
+        if options['borrar_originales']:
+            for nombre in nuevos:
+                storage.delete(nombre)
+
+        # Tarjetas y portada cacheadas tienen las URLs anteriores
+        from productos.models import Producto
+        from productos.services.cache_service import CacheService
+        Producto.objects.all().tocar()
+        CacheService.bump_version('catalogo')
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(nuevos)} archivos pasados a {len(por_contenido)} archivos por contenido'
+        ))
+
+    def _mover_derivadas(self, nombre, nuevo):
+        """las derivadas de la imagen (ImageService) pasan al nombre nuevo"""
+        from productos.models import ImagenDerivada
+        from productos.services.image_service import ImageService
+        if ImagenDerivada.objects.filter(original=nuevo).exists():
+            ImageService.borrar(nombre)  # un duplicado ya las tiene
+        else:
+            ImagenDerivada.objects.filter(original=nombre).update(original=nuevo)
@@ -1,12 +1,22 @@
 """
 Management command to migrate existing media files to Azure Blob Storage
 """
+import hashlib
+import json
+import mimetypes
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from django.core.management.base import BaseCommand
 from django.conf import settings
-from azure.storage.blob import BlobServiceClient
+from azure.storage.blob import BlobServiceClient, ContentSettings
 from pathlib import Path
 
+# Chunked transfers: files above SINGLE_PUT_SIZE are uploaded in BLOCK_SIZE blocks
+BLOCK_SIZE = 4 * 1024 * 1024
+SINGLE_PUT_SIZE = 8 * 1024 * 1024
+# Save the manifest every this many uploads
+MANIFEST_EVERY = 50
+
 class Command(BaseCommand):
     help = 'Migrate existing media files to Azure Blob Storage'
 
@@ -16,24 +26,47 @@ class Command(BaseCommand):
             action='store_true',
             help='Show what would be uploaded without actually uploading',
         )
+        parser.add_argument(
+            '--sync',
+            action='store_true',
+            help='List the container once, skip unchanged files by MD5 and upload the rest in parallel',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=8,
+            help='Parallel uploads in --sync mode',
+        )
+        parser.add_argument(
+            '--manifest',
+            default=str(settings.BASE_DIR / '.azure_media_manifest.json'),
+            help='Local manifest of uploaded files, used to resume an interrupted --sync',
+        )
 
     def handle(self, *args, **options):
         # Check if Azure Storage is configured
         account_name = os.environ.get('AZURE_STORAGE_ACCOUNT_NAME')
         account_key = os.environ.get('AZURE_STORAGE_ACCOUNT_KEY')
         container_name = os.environ.get('AZURE_STORAGE_CONTAINER_NAME', 'media')
+        # A connection string also allows a local emulator such as Azurite
+        connection_string = os.environ.get('AZURE_STORAGE_CONNECTION_STRING')
 
-        if not account_name or not account_key:
+        if not connection_string and (not account_name or not account_key):
             self.stdout.write(
                 self.style.ERROR('Azure Storage credentials not found in environment variables')
             )
             return
 
         # Initialize Azure Blob Service Client
-        blob_service_client = BlobServiceClient(
-            account_url=f"https://{account_name}.blob.core.windows.net",
-            credential=account_key
-        )
+        client_options = {'max_block_size': BLOCK_SIZE, 'max_single_put_size': SINGLE_PUT_SIZE}
+        if connection_string:
+            blob_service_client = BlobServiceClient.from_connection_string(connection_string, **client_options)
+        else:
+            blob_service_client = BlobServiceClient(
+                account_url=f"https://{account_name}.blob.core.windows.net",
+                credential=account_key,
+                **client_options
+            )
 
         # Get local media directory
         media_root = Path(settings.MEDIA_ROOT)
@@ -43,6 +76,11 @@ class Command(BaseCommand):
             )
             return
 
+        if options['sync']:
+            container_client = blob_service_client.get_container_client(container_name)
+            self.sync(container_client, media_root, options['manifest'], options['workers'], options['dry_run'])
+            return
+
         # Upload files
         uploaded_count = 0
         skipped_count = 0
@@ -97,3 +135,119 @@ class Command(BaseCommand):
                     f'Skipped: {skipped_count}, Errors: {error_count}'
                 )
             )
+
+    @staticmethod
+    def file_md5(file_path):
+        digest = hashlib.md5()
+        with open(file_path, 'rb') as data:
+            for chunk in iter(lambda: data.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def load_manifest(manifest_path):
+        """{blob name: {'size', 'mtime', 'md5'}} of files already uploaded"""
+        try:
+            with open(manifest_path, encoding='utf-8') as data:
+                return json.load(data)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    @staticmethod
+    def save_manifest(manifest_path, manifest):
+        # Write and rename, so an interrupted run never leaves a truncated manifest
+        temporary = f'{manifest_path}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as data:
+            json.dump(manifest, data)
+        os.replace(temporary, manifest_path)
+
+    @staticmethod
+    def remote_index(container_client, prefix='media/'):
+        """{blob name: (size, md5 hex or None)} with a single listing of the container"""
+        index = {}
+        for blob in container_client.list_blobs(name_starts_with=prefix):
+            content_md5 = blob.content_settings.content_md5 if blob.content_settings else None
+            index[blob.name] = (blob.size, bytes(content_md5).hex() if content_md5 else None)
+        return index
+
+    @staticmethod
+    def upload(container_client, file_path, blob_name, md5):
+        content_settings = ContentSettings(
+            content_type=mimetypes.guess_type(file_path.name)[0] or 'application/octet-stream',
+            content_md5=bytearray.fromhex(md5),
+        )
+        with open(file_path, 'rb') as data:
+            container_client.upload_blob(
+                blob_name, data, overwrite=True, content_settings=content_settings, max_concurrency=1,
+            )
+
+    def sync(self, container_client, media_root, manifest_path, workers, dry_run):
+        """
+        Uploads the media files whose size or MD5 differ from the container.
+        The container is listed once instead of one exists() request per file,
+        and the manifest keeps the MD5 of each uploaded file so that a second
+        run (or one resumed after an interruption) does not hash them again.
+        """
+        manifest = self.load_manifest(manifest_path)
+        remote = self.remote_index(container_client)
+        self.stdout.write(f'{len(remote)} blobs in the container, {len(manifest)} files in the manifest')
+
+        pending = []
+        skipped_count = 0
+        manifest_files = {Path(manifest_path).resolve(), Path(f'{manifest_path}.tmp').resolve()}
+        for file_path in media_root.rglob('*'):
+            if not file_path.is_file() or file_path.resolve() in manifest_files:
+                continue
+            blob_name = f"media/{file_path.relative_to(media_root).as_posix()}"
+            stat = file_path.stat()
+            entry = manifest.get(blob_name)
+            if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+                md5 = entry['md5']
+            else:
+                md5 = self.file_md5(file_path)
+            remote_size, remote_md5 = remote.get(blob_name, (None, None))
+            if remote_size == stat.st_size and (remote_md5 or (entry or {}).get('md5')) == md5:
+                skipped_count += 1
+                manifest[blob_name] = {'size': stat.st_size, 'mtime': stat.st_mtime, 'md5': md5}
+                continue
+            pending.append((file_path, blob_name, stat, md5))
+
+        if dry_run:
+            for file_path, blob_name, _, _ in pending:
+                self.stdout.write(f'Would upload: {file_path} -> {blob_name}')
+            self.stdout.write(self.style.SUCCESS(
+                f'Dry run complete. Would upload {len(pending)} files, {skipped_count} unchanged'
+            ))
+            return
+
+        uploaded_count = 0
+        error_count = 0
+        uploaded_bytes = 0
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = {
+                executor.submit(self.upload, container_client, file_path, blob_name, md5): (file_path, blob_name, stat, md5)
+                for file_path, blob_name, stat, md5 in pending
+            }
+            try:
+                for future in as_completed(futures):
+                    file_path, blob_name, stat, md5 = futures[future]
+                    try:
+                        future.result()
+                    except Exception as e:
+                        self.stdout.write(self.style.ERROR(f'Error uploading {file_path}: {str(e)}'))
+                        error_count += 1
+                        continue
+                    manifest[blob_name] = {'size': stat.st_size, 'mtime': stat.st_mtime, 'md5': md5}
+                    uploaded_count += 1
+                    uploaded_bytes += stat.st_size
+                    if uploaded_count % MANIFEST_EVERY == 0:
+                        self.save_manifest(manifest_path, manifest)
+            finally:
+                self.save_manifest(manifest_path, manifest)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Sync complete. Uploaded: {uploaded_count} ({uploaded_bytes / 1024 / 1024:.1f} MB), '
+                f'Unchanged: {skipped_count}, Errors: {error_count}'
+            )
+        )
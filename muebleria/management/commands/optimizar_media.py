@@ -0,0 +1,235 @@
+"""
+Recomprime o convierte las imágenes subidas y actualiza los registros que las usan
+"""
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import django
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import connections, models, transaction
+from PIL import Image, ImageOps
+
+from muebleria.content_storage import ContenidoMixin, referencias_media
+
+EXTENSIONES = {'WEBP': '.webp', 'JPEG': '.jpg', 'PNG': '.png'}
+
+
+def optimizar_imagen(contenido, formato, calidad, ancho_maximo):
+    """
+    Decodifica la imagen (bytes), la limita a `ancho_maximo` y la vuelve a
+    codificar en `formato` ('original' conserva el formato). Solo CPU: corre
+    en el pool de procesos. Devuelve (bytes, extensión) o None si no es una
+    imagen que se pueda recomprimir.
+    """
+    try:
+        imagen = Image.open(BytesIO(contenido))
+        original = imagen.format
+        imagen = ImageOps.exif_transpose(imagen)
+        imagen.load()
+    except (OSError, Image.DecompressionBombError):
+        return None
+    formato = original if formato == 'original' else formato.upper()
+    if formato not in EXTENSIONES or getattr(imagen, 'is_animated', False):
+        return None
+    if imagen.width > ancho_maximo:
+        alto = max(1, round(imagen.height * ancho_maximo / imagen.width))
+        imagen = imagen.resize((ancho_maximo, alto), Image.LANCZOS)
+    if formato == 'JPEG':
+        imagen = imagen.convert('RGB')
+    elif imagen.mode not in ('RGB', 'RGBA'):
+        imagen = imagen.convert('RGBA' if 'transparency' in imagen.info else 'RGB')
+    buffer = BytesIO()
+    if formato == 'PNG':
+        imagen.save(buffer, format='PNG', optimize=True)
+    elif formato == 'JPEG':
+        imagen.save(buffer, format='JPEG', quality=calidad, optimize=True, progressive=True)
+    else:
+        imagen.save(buffer, format='WEBP', quality=calidad, method=6)
+    return buffer.getvalue(), EXTENSIONES[formato]
+
+
+class Command(BaseCommand):
+    help = 'Recomprime las imágenes subidas en un pool de procesos y muestra cuánto espacio se ahorra'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--formato',
+            choices=['webp', 'jpeg', 'original'],
+            default='webp',
+            help='Formato de salida (por defecto webp, que conserva la transparencia)',
+        )
+        parser.add_argument('--calidad', type=int, default=82, help='Calidad WebP/JPEG (1-100)')
+        parser.add_argument(
+            '--ancho-maximo',
+            type=int,
+            default=2400,
+            help='Las imágenes más anchas se reducen a este ancho',
+        )
+        parser.add_argument(
+            '--ahorro-minimo',
+            type=float,
+            default=10,
+            help='Porcentaje mínimo de ahorro para reemplazar una imagen',
+        )
+        parser.add_argument(
+            '--procesos',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Procesos del pool (por defecto, uno por CPU)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Calcula el ahorro sin guardar archivos ni tocar registros',
+        )
+        parser.add_argument(
+            '--conservar-originales',
+            action='store_true',
+            help='No borra los archivos originales después de reemplazarlos',
+        )
+        parser.add_argument(
+            '--estado',
+            default=str(settings.BASE_DIR / '.optimizar_media.jsonl'),
+            help='Archivo de progreso: las imágenes ya procesadas no se vuelven a procesar',
+        )
+
+    def _procesados(self, ruta):
+        """nombres ya procesados en corridas anteriores (originales y resultados)"""
+        procesados = set()
+        if os.path.exists(ruta):
+            with open(ruta, encoding='utf-8') as archivo:
+                for linea in archivo:
+                    if linea.strip():
+                        registro = json.loads(linea)
+                        procesados.update(filter(None, (registro['nombre'], registro.get('nuevo'))))
+        return procesados
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        storage = default_storage
+        dry_run = options['dry_run']
+        procesados = self._procesados(options['estado'])
+        # Se mueven las filas de ImageField; las de otros FileField con el
+        # mismo archivo lo siguen usando (ver _reemplazar)
+        referencias = {}
+        otras = {}
+        for nombre, filas in referencias_media().items():
+            if nombre in procesados:
+                continue
+            imagenes = [fila for fila in filas if isinstance(fila[0]._meta.get_field(fila[1]), models.ImageField)]
+            if imagenes:
+                referencias[nombre] = imagenes
+                otras[nombre] = len(filas) - len(imagenes)
+        self.stdout.write(f'{len(referencias)} imágenes por procesar ({len(procesados)} ya procesadas)')
+
+        antes = despues = reemplazadas = sin_ahorro = faltantes = 0
+        factor = 1 - options['ahorro_minimo'] / 100
+        procesos = max(1, options['procesos'])
+        estado = None if dry_run else open(options['estado'], 'a', encoding='utf-8')
+        # Los procesos hijos no usan la base de datos: no deben heredar conexiones
+        connections.close_all()
+        contexto = multiprocessing.get_context('spawn')
+        try:
+            with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto, initializer=django.setup) as pool:
+                nombres = list(referencias)
+                # Por tandas: solo unas pocas imágenes en memoria a la vez
+                tanda = procesos * 4
+                for desde in range(0, len(nombres), tanda):
+                    futuros = {}
+                    for nombre in nombres[desde:desde + tanda]:
+                        if not storage.exists(nombre):
+                            faltantes += 1
+                            continue
+                        with storage.open(nombre, 'rb') as archivo:
+                            contenido = archivo.read()
+                        futuros[nombre] = (len(contenido), pool.submit(
+                            optimizar_imagen, contenido, options['formato'],
+                            options['calidad'], options['ancho_maximo'],
+                        ))
+
+                    for nombre, (tamano, futuro) in futuros.items():
+                        resultado = futuro.result()
+                        antes += tamano
+                        if resultado is None or len(resultado[0]) > tamano * factor:
+                            despues += tamano
+                            sin_ahorro += 1
+                            nuevo = None
+                        else:
+                            optimizada, extension = resultado
+                            despues += len(optimizada)
+                            reemplazadas += 1
+                            nuevo = None
+                            if not dry_run:
+                                nuevo = self._reemplazar(
+                                    storage, nombre, optimizada, extension, referencias[nombre],
+                                    otras[nombre], options['conservar_originales'],
+                                )
+                        if estado is not None:
+                            estado.write(json.dumps({'nombre': nombre, 'nuevo': nuevo}) + '\n')
+                            estado.flush()
+        finally:
+            if estado is not None:
+                estado.close()
+
+        if reemplazadas and not dry_run:
+            # Tarjetas y portada cacheadas tienen las URLs anteriores
+            from productos.models import Producto
+            from productos.services.cache_service import CacheService
+            Producto.objects.all().tocar()
+            CacheService.bump_version('catalogo')
+
+        ahorro = antes - despues
+        porcentaje = ahorro * 100 / antes if antes else 0
+        self.stdout.write(
+            f'{reemplazadas} imágenes {"se reemplazarían" if dry_run else "reemplazadas"}, '
+            f'{sin_ahorro} sin ahorro suficiente, {faltantes} no encontradas\n'
+            f'Antes: {antes / 1024 / 1024:.1f} MB, después: {despues / 1024 / 1024:.1f} MB '
+            f'(ahorro {ahorro / 1024 / 1024:.1f} MB, {porcentaje:.0f}%) '
+            f'en {time.monotonic() - inicio:.1f} s'
+        )
+
+    def _reemplazar(self, storage, nombre, contenido, extension, filas, otras, conservar):
+        """
+        Guarda la versión optimizada y pasa a ella todas las filas que usaban
+        `nombre`, en una transacción: si algo falla no quedan referencias de
+        más ni archivos borrados. Salvo con `conservar`, con almacenamiento
+        por contenido cada fila movida suelta su referencia al original (las
+        demás filas que lo usen conservan la suya); si no, el original se
+        borra solo si ninguna otra fila (`otras`) lo usa.
+        """
+        from productos.models import ImagenDerivada
+        from productos.services.image_service import ImageService
+        por_contenido = isinstance(storage, ContenidoMixin)
+        nuevo = None
+        try:
+            with transaction.atomic():
+                nuevo = storage.save(os.path.splitext(nombre)[0] + extension, ContentFile(contenido))
+                if por_contenido:
+                    for _ in filas[1:]:
+                        storage.agregar_referencia(nuevo)  # una referencia por fila
+                for modelo, campo, pk in filas:
+                    # update(): sin señales ni auto_now
+                    modelo._default_manager.filter(pk=pk).update(**{campo: nuevo})
+                # Las derivadas no cambian: siguen sirviendo para la imagen nueva
+                if ImagenDerivada.objects.filter(original=nuevo).exists():
+                    ImageService.borrar(nombre, storage)  # la imagen nueva ya las tiene
+                else:
+                    ImagenDerivada.objects.filter(original=nombre).update(original=nuevo)
+                if not conservar and por_contenido and ContenidoMixin.es_de_contenido(nombre):
+                    # delete() resta la referencia y borra al confirmar, si fue la última
+                    for _ in filas:
+                        storage.delete(nombre)
+                elif not conservar and not otras:
+                    transaction.on_commit(lambda: storage.delete(nombre))
+        except Exception:
+            if nuevo is not None and not por_contenido:
+                storage.delete(nuevo)  # sin registro de referencias: no queda usado
+            raise
+        return nuevo
@@ -0,0 +1,137 @@
+"""
+Worker de la cola de trabajos en segundo plano (derivadas de imágenes)
+"""
+import multiprocessing
+import os
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from muebleria.trabajos import ColaTrabajos, obtener_tarea
+
+
+class Command(BaseCommand):
+    help = 'Procesa los trabajos pendientes repartiendo el trabajo de CPU en un pool de procesos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--procesos',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Procesos del pool (por defecto, uno por CPU)',
+        )
+        parser.add_argument(
+            '--una-vez',
+            action='store_true',
+            help='Termina cuando no quedan trabajos pendientes',
+        )
+        parser.add_argument(
+            '--espera',
+            type=float,
+            default=2.0,
+            help='Segundos entre consultas cuando la cola está vacía',
+        )
+
+    def _pool(self, procesos):
+        contexto = multiprocessing.get_context('spawn')
+        return ProcessPoolExecutor(max_workers=procesos, mp_context=contexto, initializer=django.setup)
+
+    def handle(self, *args, **options):
+        procesos = max(1, options['procesos'])
+        # Los procesos hijos no usan la base de datos: no deben heredar conexiones
+        connections.close_all()
+        pool = self._pool(procesos)
+        self.stdout.write(f'Procesando trabajos con {procesos} procesos')
+        procesados = 0
+        try:
+            while True:
+                ColaTrabajos.recuperar_abandonados()
+                # El doble de trabajos que procesos para que el pool no quede ocioso
+                trabajos = ColaTrabajos.tomar(procesos * 2)
+                if not trabajos:
+                    if options['una_vez']:
+                        break
+                    time.sleep(options['espera'])
+                    continue
+                terminados, roto = self._procesar(pool, trabajos)
+                procesados += terminados
+                if roto:
+                    # Un proceso hijo murió (memoria, decodificador): el pool ya no sirve
+                    self.stderr.write('El pool de procesos se rompió; se crea uno nuevo')
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = self._pool(procesos)
+        finally:
+            pool.shutdown(cancel_futures=True)
+        self.stdout.write(self.style.SUCCESS(f'{procesados} trabajos terminados'))
+
+    def _procesar(self, pool, trabajos):
+        """
+        preparar en este proceso, calcular en el pool y terminar de nuevo aquí.
+        Devuelve (terminados, si el pool se rompió); los trabajos que estaban
+        en el pool roto se reintentan más tarde. Mientras tanto renueva el
+        latido de los trabajos para que otro worker no los tome como abandonados.
+        """
+        futuros = {}
+        terminados = 0
+        roto = False
+        self._ultimo_latido = time.monotonic()
+        for trabajo in trabajos:
+            self._latir(trabajos)
+            try:
+                tarea = obtener_tarea(trabajo.tipo)
+                argumentos = tarea.preparar(trabajo.datos)
+            except Exception:
+                self._fallar(trabajo)
+                continue
+            if argumentos is None:
+                ColaTrabajos.terminar(trabajo)  # no queda nada que hacer
+                terminados += 1
+                continue
+            try:
+                futuros[pool.submit(tarea.calcular, *argumentos)] = (trabajo, tarea)
+            except BrokenProcessPool:
+                roto = True
+                self._fallar(trabajo, 'El pool de procesos estaba roto al encolarlo')
+
+        pendientes = set(futuros)
+        while pendientes:
+            listos, pendientes = wait(
+                pendientes, timeout=ColaTrabajos.LATIDO.total_seconds(), return_when=FIRST_COMPLETED,
+            )
+            for futuro in listos:
+                self._latir(trabajos)
+                trabajo, tarea = futuros[futuro]
+                try:
+                    resultado = futuro.result()
+                except BrokenProcessPool:
+                    roto = True
+                    self._fallar(trabajo, 'El pool de procesos se rompió mientras se calculaba')
+                    continue
+                except Exception:
+                    self._fallar(trabajo)
+                    continue
+                try:
+                    tarea.terminar(trabajo.datos, resultado)
+                except Exception:
+                    self._fallar(trabajo)
+                    continue
+                ColaTrabajos.terminar(trabajo)
+                terminados += 1
+            self._latir(trabajos)
+        return terminados, roto
+
+    def _latir(self, trabajos):
+        """renueva el latido si pasó ColaTrabajos.LATIDO desde el anterior"""
+        if time.monotonic() - self._ultimo_latido >= ColaTrabajos.LATIDO.total_seconds():
+            ColaTrabajos.latido(trabajos)
+            self._ultimo_latido = time.monotonic()
+
+    def _fallar(self, trabajo, error=None):
+        error = error or traceback.format_exc()
+        self.stderr.write(f'Trabajo {trabajo.pk} ({trabajo.tipo}) falló:\n{error}')
+        ColaTrabajos.fallar(trabajo, error)
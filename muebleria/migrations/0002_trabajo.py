@@ -0,0 +1,35 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:52
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('muebleria', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Trabajo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(max_length=150)),
+                ('datos', models.JSONField(default=dict)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('terminado', 'Terminado'), ('error', 'Error')], default='pendiente', max_length=20)),
+                ('intentos', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('disponible_desde', models.DateTimeField(default=django.utils.timezone.now)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True)),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Trabajo',
+                'verbose_name_plural': 'Trabajos',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['estado', 'disponible_desde', 'id'], name='trabajo_pendientes_idx')],
+            },
+        ),
+    ]
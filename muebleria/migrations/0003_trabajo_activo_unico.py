@@ -0,0 +1,32 @@
+# Generated by Django 5.2.1 on 2026-10-18 15:05
+
+from django.db import migrations, models
+
+
+def descartar_duplicados(apps, schema_editor):
+    """deja un solo trabajo en curso por (tipo, datos): el más antiguo"""
+    Trabajo = apps.get_model('muebleria', 'Trabajo')
+    vistos = set()
+    duplicados = []
+    activos = Trabajo.objects.filter(estado__in=['pendiente', 'procesando']).order_by('id')
+    for trabajo_id, tipo, datos in activos.values_list('id', 'tipo', 'datos').iterator():
+        clave = (tipo, repr(sorted(datos.items())) if isinstance(datos, dict) else repr(datos))
+        if clave in vistos:
+            duplicados.append(trabajo_id)
+        vistos.add(clave)
+    Trabajo.objects.filter(pk__in=duplicados).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('muebleria', '0002_trabajo'),
+    ]
+
+    operations = [
+        migrations.RunPython(descartar_duplicados, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='trabajo',
+            constraint=models.UniqueConstraint(condition=models.Q(('estado__in', ['pendiente', 'procesando'])), fields=('tipo', 'datos'), name='trabajo_activo_unico'),
+        ),
+    ]
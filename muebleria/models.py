@@ -0,0 +1,70 @@
+from django.db import models
+from django.utils import timezone
+
+
+class ArchivoMedia(models.Model):
+    """
+    Archivo guardado por contenido (ver muebleria.content_storage): el nombre
+    sale del hash, así que subir los mismos bytes otra vez no crea otro
+    archivo sino otra referencia. Se borra cuando no queda ninguna.
+    """
+    nombre = models.CharField(max_length=255, unique=True)
+    sha256 = models.CharField(max_length=64, db_index=True)
+    tamano = models.PositiveBigIntegerField(default=0)
+    referencias = models.PositiveIntegerField(default=0)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Archivo de Media'
+        verbose_name_plural = 'Archivos de Media'
+
+    def __str__(self):
+        return f"{self.nombre} ({self.referencias} referencias)"
+
+
+class Trabajo(models.Model):
+    """
+    Trabajo en segundo plano (cola en la base de datos). Lo procesa el
+    comando procesar_trabajos; `tipo` es la ruta de una Tarea (muebleria.trabajos).
+    """
+    PENDIENTE = 'pendiente'
+    PROCESANDO = 'procesando'
+    TERMINADO = 'terminado'
+    ERROR = 'error'
+    ESTADOS = [
+        (PENDIENTE, 'Pendiente'),
+        (PROCESANDO, 'Procesando'),
+        (TERMINADO, 'Terminado'),
+        (ERROR, 'Error'),
+    ]
+    # Un mismo trabajo (tipo y datos) no puede estar dos veces en curso
+    ACTIVOS = [PENDIENTE, PROCESANDO]
+
+    tipo = models.CharField(max_length=150)
+    datos = models.JSONField(default=dict)
+    estado = models.CharField(max_length=20, choices=ESTADOS, default=PENDIENTE)
+    intentos = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    disponible_desde = models.DateTimeField(default=timezone.now)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    # El worker la renueva mientras procesa (latido, ver ColaTrabajos)
+    fecha_inicio = models.DateTimeField(blank=True, null=True)
+    fecha_fin = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['id']
+        verbose_name = 'Trabajo'
+        verbose_name_plural = 'Trabajos'
+        indexes = [
+            models.Index(fields=['estado', 'disponible_desde', 'id'], name='trabajo_pendientes_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['tipo', 'datos'],
+                condition=models.Q(estado__in=['pendiente', 'procesando']),
+                name='trabajo_activo_unico',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} #{self.pk} ({self.estado})"
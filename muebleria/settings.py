@@ -47,9 +47,11 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
 
     #Apps creados por el usuario para el proyecto
+    'muebleria',
     'login',
     'productos',
     'usuarios',
@@ -156,9 +158,11 @@ if USE_AZURE_STORAGE:
     AZURE_ACCOUNT_KEY = os.environ.get('AZURE_STORAGE_ACCOUNT_KEY')
     AZURE_CONTAINER = os.environ.get('AZURE_STORAGE_CONTAINER_NAME', 'media')
     
-    # Custom storage backend
-    DEFAULT_FILE_STORAGE = 'muebleria.custom_storage.AzureMediaStorage'
-    STATICFILES_STORAGE = 'muebleria.custom_storage.AzureStaticStorage'
+    # Custom storage backend (media por contenido, ver muebleria.content_storage)
+    STORAGES = {
+        'default': {'BACKEND': 'muebleria.custom_storage.ContenidoAzureMediaStorage'},
+        'staticfiles': {'BACKEND': 'muebleria.custom_storage.AzureStaticStorage'},
+    }
     
     # URLs for media files
     MEDIA_URL = f'https://{AZURE_ACCOUNT_NAME}.blob.core.windows.net/{AZURE_CONTAINER}/media/'
@@ -171,6 +175,56 @@ else:
     # Local storage (development)
     MEDIA_URL = '/media/'
     MEDIA_ROOT = BASE_DIR / 'media'
+    STORAGES = {
+        'default': {'BACKEND': 'muebleria.content_storage.ContenidoFileSystemStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    }
+
+# Copia local de media remota para el código del servidor (muebleria.cache_media):
+# adjuntos PDF y procesamiento de imágenes leen de disco después de la primera descarga
+MEDIA_CACHE_DIR = os.environ.get('MEDIA_CACHE_DIR', str(BASE_DIR / '.media_cache'))
+MEDIA_CACHE_MAX_BYTES = int(os.environ.get('MEDIA_CACHE_MAX_MB', '512')) * 1024 * 1024
+
+# Subidas de imágenes desde el admin: con SUBIDAS_DIFERIDAS el request solo
+# deja el archivo en SUBIDAS_PENDIENTES_DIR y procesar_trabajos lo sube al
+# almacenamiento (muebleria.content_storage). El directorio tiene que ser el
+# mismo para el sitio y el worker (misma máquina o volumen compartido)
+SUBIDAS_DIFERIDAS = os.environ.get('SUBIDAS_DIFERIDAS', str(USE_AZURE_STORAGE)).lower() == 'true'
+SUBIDAS_PENDIENTES_DIR = os.environ.get('SUBIDAS_PENDIENTES_DIR', str(BASE_DIR / '.subidas_pendientes'))
+
+# Descargas de PDF (productos.services.download_service): con Azure, redirigir
+# a una URL firmada de corta duración en vez de pasar el archivo por el worker
+DESCARGAS_URL_FIRMADA = os.environ.get('DESCARGAS_URL_FIRMADA', 'False').lower() == 'true'
+DESCARGAS_URL_FIRMADA_SEGUNDOS = int(os.environ.get('DESCARGAS_URL_FIRMADA_SEGUNDOS', '300'))
+
+# Versiones reducidas de las imágenes (productos.services.image_service):
+# WebP siempre; AVIF además si se activa y Pillow lo soporta (más lento)
+IMAGENES_AVIF = os.environ.get('IMAGENES_AVIF', 'False').lower() == 'true'
+
+# Cache: Redis compartido entre workers si se configura REDIS_URL; en
+# desarrollo, memoria local del proceso.
+# En producción REDIS_URL es obligatorio con más de un proceso (gunicorn
+# -w N): las versiones que invalidan los índices en memoria de cada worker
+# (productos.services.cache_service) se guardan en esta cache, y con
+# LocMemCache un cambio en un worker nunca llega a los demás. Sin DEBUG y
+# sin REDIS_URL el chequeo productos.E001 falla; CACHE_UN_PROCESO=True lo
+# permite si el sitio corre en un solo proceso.
+REDIS_URL = os.environ.get('REDIS_URL')
+CACHE_UN_PROCESO = os.environ.get('CACHE_UN_PROCESO', 'False').lower() == 'true'
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
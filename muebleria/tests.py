@@ -0,0 +1,154 @@
+import os
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from muebleria.cache_media import CacheMedia
+from muebleria.content_storage import ContenidoFileSystemStorage, tarea_subida
+from muebleria.models import ArchivoMedia, Trabajo
+from muebleria.trabajos import ColaTrabajos
+
+
+class SinSobrescribirStorage(ContenidoFileSystemStorage):
+    """Como Azure con file_overwrite = False: falla si el archivo ya existe"""
+
+    def _save(self, name, content):
+        if self.exists(name):
+            raise FileExistsError(name)
+        return super()._save(name, content)
+
+
+class ContenidoStorageTests(TestCase):
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio)
+        self.storage = ContenidoFileSystemStorage(location=self.directorio)
+
+    def archivos(self):
+        return [nombre for _, _, nombres in os.walk(self.directorio) for nombre in nombres]
+
+    def referencias(self, nombre):
+        return ArchivoMedia.objects.get(nombre=nombre).referencias
+
+    def test_mismos_bytes_un_archivo_dos_referencias(self):
+        nombre = self.storage.save('a.png', ContentFile(b'imagen'))
+        self.assertEqual(self.storage.save('b.png', ContentFile(b'imagen')), nombre)
+        self.assertEqual(self.referencias(nombre), 2)
+        self.assertEqual(len(self.archivos()), 1)
+
+    def test_se_borra_con_la_ultima_referencia(self):
+        nombre = self.storage.save('a.png', ContentFile(b'imagen'))
+        self.storage.save('b.png', ContentFile(b'imagen'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.storage.delete(nombre)
+        self.assertTrue(self.storage.exists(nombre))
+        self.assertEqual(self.referencias(nombre), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.storage.delete(nombre)
+        self.assertFalse(self.storage.exists(nombre))
+        self.assertFalse(ArchivoMedia.objects.filter(nombre=nombre).exists())
+
+    def test_rollback_conserva_el_archivo(self):
+        nombre = self.storage.save('a.png', ContentFile(b'imagen'))
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    self.storage.delete(nombre)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertTrue(self.storage.exists(nombre))
+        self.assertEqual(self.referencias(nombre), 1)
+
+    def test_guardar_durante_un_borrado_pendiente(self):
+        for storage in (self.storage, SinSobrescribirStorage(location=self.directorio)):
+            with self.subTest(storage=type(storage).__name__):
+                nombre = storage.save('a.png', ContentFile(b'imagen'))
+                with self.captureOnCommitCallbacks() as callbacks:
+                    storage.delete(nombre)
+                self.assertEqual(self.referencias(nombre), 0)
+
+                # Los mismos bytes otra vez antes de que corra el borrado
+                self.assertEqual(storage.save('b.png', ContentFile(b'imagen')), nombre)
+                for callback in callbacks:
+                    callback()
+                self.assertTrue(storage.exists(nombre))
+                self.assertEqual(self.referencias(nombre), 1)
+                self.assertEqual(len(self.archivos()), 1)
+
+                with self.captureOnCommitCallbacks(execute=True):
+                    storage.delete(nombre)
+                self.assertFalse(storage.exists(nombre))
+
+    def test_archivo_escrito_por_otro_proceso(self):
+        storage = SinSobrescribirStorage(location=self.directorio)
+        nombre = storage.nombre_contenido(storage.calcular_hash(ContentFile(b'imagen')), 'a.png')
+        # Otro proceso escribió el archivo pero todavía no lo registró
+        storage._escribir(nombre, ContentFile(b'imagen'))
+        storage._escribir(nombre, ContentFile(b'imagen'))
+        self.assertEqual(storage.save('a.png', ContentFile(b'imagen')), nombre)
+        self.assertEqual(self.referencias(nombre), 1)
+        self.assertEqual(len(self.archivos()), 1)
+
+
+class SubidaDiferidaTests(TestCase):
+    def setUp(self):
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio)
+        self.storage = ContenidoFileSystemStorage(location=os.path.join(self.directorio, 'media'))
+        ajustes = override_settings(SUBIDAS_PENDIENTES_DIR=os.path.join(self.directorio, 'pendientes'))
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def test_se_sube_en_el_worker(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            nombre = self.storage.reservar('a.png', ContentFile(b'imagen'))
+            self.assertEqual(self.storage.reservar('b.png', ContentFile(b'imagen')), nombre)
+        self.assertFalse(self.storage.exists(nombre))
+        self.assertEqual(ArchivoMedia.objects.get(nombre=nombre).referencias, 2)
+        self.assertEqual(Trabajo.objects.filter(tipo=tarea_subida.ruta, datos={'nombre': nombre}).count(), 1)
+        # Mientras tanto el servidor lee la copia local
+        with CacheMedia(self.storage, os.path.join(self.directorio, 'cache')).open(nombre) as archivo:
+            self.assertEqual(archivo.read(), b'imagen')
+
+        self.storage.subir_pendiente(nombre)
+        self.assertTrue(self.storage.exists(nombre))
+        self.assertIsNone(self.storage.ruta_pendiente(nombre))
+
+    def test_ya_guardado_no_se_vuelve_a_subir(self):
+        nombre = self.storage.save('a.png', ContentFile(b'imagen'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.storage.reservar('b.png', ContentFile(b'imagen')), nombre)
+        self.assertIsNone(self.storage.ruta_pendiente(nombre))
+        self.assertFalse(Trabajo.objects.exists())
+        self.assertEqual(ArchivoMedia.objects.get(nombre=nombre).referencias, 2)
+
+
+class RecuperarAbandonadosTests(TestCase):
+    def crear(self, intentos, hace):
+        return Trabajo.objects.create(
+            tipo='x', datos={'intentos': intentos, 'hace': str(hace)}, estado=Trabajo.PROCESANDO,
+            intentos=intentos, fecha_inicio=timezone.now() - hace,
+        )
+
+    def test_con_latido_reciente_no_se_toca(self):
+        trabajo = self.crear(1, ColaTrabajos.ABANDONADO * 2)
+        ColaTrabajos.latido([trabajo])
+        self.assertEqual(ColaTrabajos.recuperar_abandonados(), 0)
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, Trabajo.PROCESANDO)
+
+    def test_reintenta_hasta_agotar_los_intentos(self):
+        reintento = self.crear(1, ColaTrabajos.ABANDONADO * 2)
+        agotado = self.crear(ColaTrabajos.MAX_INTENTOS, ColaTrabajos.ABANDONADO * 2)
+        self.assertEqual(ColaTrabajos.recuperar_abandonados(), 2)
+        reintento.refresh_from_db()
+        agotado.refresh_from_db()
+        self.assertEqual(reintento.estado, Trabajo.PENDIENTE)
+        self.assertEqual(agotado.estado, Trabajo.ERROR)
@@ -0,0 +1,128 @@
+"""
+Cola de trabajos en segundo plano sobre la tabla Trabajo
+"""
+import datetime
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+
+class Tarea:
+    """
+    Un tipo de trabajo en tres pasos. preparar(datos) corre en el worker
+    (lecturas de base de datos y archivos) y devuelve los argumentos de
+    calcular(*args), que corre en el pool de procesos (trabajo de CPU, sin
+    base de datos). terminar(datos, resultado) vuelve al worker y guarda.
+    Las tres deben ser funciones de módulo (el pool las pasa por pickle).
+    Una tarea sin trabajo de CPU hace todo en preparar y devuelve None
+    (calcular y terminar pueden ser None).
+    """
+
+    def __init__(self, ruta, preparar, calcular=None, terminar=None):
+        self.ruta = ruta
+        self.preparar = preparar
+        self.calcular = calcular
+        self.terminar = terminar
+
+    def encolar(self, **datos):
+        """
+        Crea el trabajo cuando se confirma la transacción actual, salvo que
+        ya haya uno igual pendiente o en proceso (restricción trabajo_activo_unico).
+        """
+        from muebleria.models import Trabajo
+
+        def _crear():
+            if Trabajo.objects.filter(tipo=self.ruta, datos=datos, estado__in=Trabajo.ACTIVOS).exists():
+                return
+            try:
+                with transaction.atomic():
+                    Trabajo.objects.create(tipo=self.ruta, datos=datos)
+            except IntegrityError:
+                pass  # otro proceso lo encoló al mismo tiempo
+        transaction.on_commit(_crear)
+
+
+def obtener_tarea(tipo):
+    tarea = import_string(tipo)
+    if not isinstance(tarea, Tarea):
+        raise TypeError(f'{tipo} no es una Tarea')
+    return tarea
+
+
+class ColaTrabajos:
+    """Operaciones del worker sobre la tabla Trabajo"""
+
+    MAX_INTENTOS = 3
+    # Mientras procesa, el worker renueva fecha_inicio cada LATIDO; un trabajo
+    # "procesando" sin renovar hace más de ABANDONADO es de un worker que murió
+    LATIDO = datetime.timedelta(minutes=1)
+    ABANDONADO = datetime.timedelta(minutes=15)
+
+    @staticmethod
+    def tomar(limite):
+        """
+        Marca como procesando y devuelve hasta `limite` trabajos pendientes.
+        skip_locked: varios workers toman trabajos distintos sin esperarse.
+        """
+        from muebleria.models import Trabajo
+        ahora = timezone.now()
+        with transaction.atomic():
+            trabajos = list(
+                Trabajo.objects.select_for_update(skip_locked=True)
+                .filter(estado=Trabajo.PENDIENTE, disponible_desde__lte=ahora)
+                .order_by('id')[:limite]
+            )
+            if trabajos:
+                Trabajo.objects.filter(pk__in=[t.pk for t in trabajos]).update(
+                    estado=Trabajo.PROCESANDO, fecha_inicio=ahora, intentos=F('intentos') + 1,
+                )
+        for trabajo in trabajos:
+            trabajo.intentos += 1
+        return trabajos
+
+    @staticmethod
+    def latido(trabajos):
+        """renueva fecha_inicio de los trabajos que siguen en proceso"""
+        from muebleria.models import Trabajo
+        Trabajo.objects.filter(pk__in=[t.pk for t in trabajos], estado=Trabajo.PROCESANDO).update(
+            fecha_inicio=timezone.now(),
+        )
+
+    @staticmethod
+    def terminar(trabajo):
+        from muebleria.models import Trabajo
+        Trabajo.objects.filter(pk=trabajo.pk).update(estado=Trabajo.TERMINADO, fecha_fin=timezone.now(), error='')
+
+    @staticmethod
+    def fallar(trabajo, error):
+        """reintenta más tarde (espera creciente) o marca error definitivo"""
+        from muebleria.models import Trabajo
+        if trabajo.intentos < ColaTrabajos.MAX_INTENTOS:
+            espera = datetime.timedelta(seconds=30 * 2 ** trabajo.intentos)
+            Trabajo.objects.filter(pk=trabajo.pk).update(
+                estado=Trabajo.PENDIENTE, disponible_desde=timezone.now() + espera, error=error,
+            )
+        else:
+            Trabajo.objects.filter(pk=trabajo.pk).update(estado=Trabajo.ERROR, fecha_fin=timezone.now(), error=error)
+
+    @staticmethod
+    def recuperar_abandonados():
+        """
+        Devuelve a la cola los trabajos de workers que murieron. El intento
+        ya se contó en tomar(): los que agotaron MAX_INTENTOS (por ejemplo,
+        uno que tira abajo el worker cada vez) quedan en error.
+        """
+        from muebleria.models import Trabajo
+        ahora = timezone.now()
+        error = 'El worker dejó de procesarlo sin terminarlo'
+        abandonados = Trabajo.objects.filter(
+            estado=Trabajo.PROCESANDO, fecha_inicio__lt=ahora - ColaTrabajos.ABANDONADO,
+        )
+        agotados = abandonados.filter(intentos__gte=ColaTrabajos.MAX_INTENTOS).update(
+            estado=Trabajo.ERROR, fecha_fin=ahora, error=error,
+        )
+        return agotados + abandonados.filter(intentos__lt=ColaTrabajos.MAX_INTENTOS).update(
+            estado=Trabajo.PENDIENTE, error=error,
+        )
@@ -1,15 +1,50 @@
+from django import forms
+from django.conf import settings
 from django.contrib import admin
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import UploadedFile
 from django.http import HttpResponseRedirect
 from django.urls import path
 from django.contrib import messages
-from .models import Producto, Categoria, Inventario, Carrito, ItemCarrito, ImagenProducto, Wishlist, BannerPromocional, Pedido, DetallePedido, ResumenPedido
+from .models import Producto, Categoria, Inventario, Carrito, ItemCarrito, ImagenProducto, Wishlist, BannerPromocional, Pedido, DetallePedido, ResumenPedido, Sinonimo
 from .services.pdf_service import PDFService
 from .services.email_service import EmailService
 from .services.excel_service import ExcelExportService
 from django.http import HttpResponse
 
+class SubidaDiferidaForm(forms.ModelForm):
+    """
+    Con SUBIDAS_DIFERIDAS las imágenes nuevas de `campos_diferidos` no se
+    suben durante el request: el almacenamiento las reserva y el comando
+    procesar_trabajos las sube (ver ContenidoMixin.reservar).
+    """
+    campos_diferidos = ()
+
+    def save(self, commit=True):
+        if settings.SUBIDAS_DIFERIDAS and hasattr(default_storage, 'reservar'):
+            for campo in self.campos_diferidos:
+                archivo = self.cleaned_data.get(campo)
+                if isinstance(archivo, UploadedFile):
+                    setattr(self.instance, campo, default_storage.reservar(archivo.name, archivo))
+        return super().save(commit)
+
+class ImagenProductoForm(SubidaDiferidaForm):
+    campos_diferidos = ('imagen',)
+
+    class Meta:
+        model = ImagenProducto
+        fields = '__all__'
+
+class ProductoForm(SubidaDiferidaForm):
+    campos_diferidos = ('imagen_principal',)
+
+    class Meta:
+        model = Producto
+        fields = '__all__'
+
 class ImagenProductoInline(admin.TabularInline):
     model = ImagenProducto
+    form = ImagenProductoForm
     extra = 1
 
 class DetallePedidoInline(admin.TabularInline):
@@ -19,11 +54,12 @@ class DetallePedidoInline(admin.TabularInline):
 
 @admin.register(Producto)
 class ProductoAdmin(admin.ModelAdmin):
-    list_display = ('nombre', 'categoria', 'precio', 'precio_oferta', 'oferta_activa', 'activo', 'ventas')
+    form = ProductoForm
+    list_display = ('nombre', 'categoria', 'precio', 'precio_oferta', 'oferta_activa', 'precio_efectivo', 'activo', 'ventas')
     list_filter = ('categoria', 'oferta_activa', 'activo')
     search_fields = ('nombre', 'descripcion')
     inlines = [ImagenProductoInline]
-    actions = ['exportar_inventario_excel']
+    actions = ['exportar_inventario_excel', 'activar_ofertas', 'desactivar_ofertas']
 
     def exportar_inventario_excel(self, request, queryset):
         """Exporta inventario de productos seleccionados a Excel."""
@@ -35,11 +71,31 @@ class ProductoAdmin(admin.ModelAdmin):
 
     exportar_inventario_excel.short_description = "Exportar inventario a Excel"
 
+    def activar_ofertas(self, request, queryset):
+        """Activa la oferta de los productos seleccionados (recalcula el precio efectivo)."""
+        filas = queryset.cambiar_oferta(True)
+        self.message_user(request, f"Oferta activada en {filas} productos.")
+
+    activar_ofertas.short_description = "Activar oferta"
+
+    def desactivar_ofertas(self, request, queryset):
+        """Desactiva la oferta de los productos seleccionados (recalcula el precio efectivo)."""
+        filas = queryset.cambiar_oferta(False)
+        self.message_user(request, f"Oferta desactivada en {filas} productos.")
+
+    desactivar_ofertas.short_description = "Desactivar oferta"
+
 @admin.register(Categoria)
 class CategoriaAdmin(admin.ModelAdmin):
     list_display = ('nombre', 'slug')
     prepopulated_fields = {'slug': ('nombre',)}
 
+@admin.register(Sinonimo)
+class SinonimoAdmin(admin.ModelAdmin):
+    list_display = ('terminos', 'activo')
+    list_filter = ('activo',)
+    search_fields = ('terminos',)
+
 @admin.register(Inventario)
 class InventarioAdmin(admin.ModelAdmin):
     list_display = ('producto', 'stock', 'stock_minimo', 'stock_maximo')
@@ -1,6 +1,16 @@
+import logging
+
 from django.apps import AppConfig
 
+logger = logging.getLogger(__name__)
+
 
 class ProductosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'productos'
+
+    def ready(self):
+        from .checks import cache_compartida
+        # gunicorn no corre los chequeos del sistema: avisar también al arrancar
+        for error in cache_compartida():
+            logger.warning('%s %s', error.msg, error.hint)
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+# Backends cuya cache no se comparte entre procesos
+CACHES_POR_PROCESO = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register()
+def cache_compartida(app_configs=None, **kwargs):
+    """
+    Las versiones de CacheService (invalidación de los índices en memoria)
+    tienen que verse desde todos los workers: sin DEBUG la cache debe ser
+    compartida (REDIS_URL) salvo que el sitio corra en un solo proceso.
+    """
+    backend = settings.CACHES['default']['BACKEND']
+    if settings.DEBUG or settings.CACHE_UN_PROCESO or backend not in CACHES_POR_PROCESO:
+        return []
+    return [Error(
+        f'La cache por defecto ({backend}) no se comparte entre procesos: '
+        'los cambios de catálogo no llegan a los demás workers.',
+        hint='Configurar REDIS_URL, o CACHE_UN_PROCESO=True si corre un solo proceso.',
+        id='productos.E001',
+    )]
@@ -1,7 +1,16 @@
+from django.utils.functional import SimpleLazyObject
+
 from .models import Wishlist
+from .services.image_service import ImageService
 
 def wishlist_menu_context(request):
     if request.user.is_authenticated:
         wishlist, _ = Wishlist.objects.get_or_create(usuario=request.user)
-        return {'wishlist_menu': wishlist}
-    return {'wishlist_menu': None} 
\ No newline at end of file
+        return {
+            'wishlist_menu': wishlist,
+            # Miniaturas del menú en una sola consulta, solo si se renderiza
+            'variantes_wishlist': SimpleLazyObject(lambda: ImageService.variantes_many(
+                wishlist.productos.values_list('imagen_principal', flat=True)
+            )),
+        }
+    return {'wishlist_menu': None}
@@ -0,0 +1,82 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from productos.services.fuzzy_service import FuzzyIndex
+
+MUEBLES = [
+    'mesa', 'silla', 'sillon', 'sofa', 'lampara', 'cama', 'comedor', 'escritorio', 'ropero',
+    'buro', 'cajonera', 'librero', 'repisa', 'banco', 'taburete', 'cabecera', 'colchon',
+    'vitrina', 'credenza', 'tocador', 'perchero', 'espejo', 'alfombra', 'cortina', 'puff',
+]
+DETALLES = [
+    'de', 'centro', 'pie', 'noche', 'madera', 'roble', 'pino', 'nogal', 'cedro', 'metal',
+    'vidrio', 'marmol', 'tapizado', 'lino', 'piel', 'plegable', 'extensible', 'moderno',
+    'rustico', 'nordico', 'industrial', 'vintage', 'blanco', 'negro', 'gris', 'natural',
+    'individual', 'matrimonial', 'king', 'esquinero', 'reclinable', 'infantil', 'jardin',
+]
+LETRAS = 'abcdefghijklmnopqrstuvwxyz'
+
+
+class Command(BaseCommand):
+    help = 'Mide la corrección de búsquedas con errores sobre un catálogo sintético.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, default=50000)
+        parser.add_argument('--consultas', type=int, default=2000)
+        parser.add_argument('--semilla', type=int, default=42)
+
+    def _nombre(self, rnd, i):
+        palabras = [rnd.choice(MUEBLES)] + rnd.sample(DETALLES, rnd.randint(1, 3))
+        # Modelos/líneas propios de cada tienda: vocabulario grande y poco repetido
+        palabras.append(f"{rnd.choice(DETALLES)[:3]}{rnd.choice(LETRAS)}{i % 997}")
+        return ' '.join(palabras)
+
+    def _con_error(self, rnd, palabra):
+        errores = FuzzyIndex.max_errores(palabra)
+        for _ in range(rnd.randint(1, errores)):
+            pos = rnd.randrange(len(palabra))
+            tipo = rnd.choice(('borrar', 'cambiar', 'insertar'))
+            if tipo == 'borrar' and len(palabra) > 2:
+                palabra = palabra[:pos] + palabra[pos + 1:]
+            elif tipo == 'cambiar':
+                palabra = palabra[:pos] + rnd.choice(LETRAS) + palabra[pos + 1:]
+            else:
+                palabra = palabra[:pos] + rnd.choice(LETRAS) + palabra[pos:]
+        return palabra
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options['semilla'])
+        nombres = [self._nombre(rnd, i) for i in range(options['productos'])]
+
+        inicio = time.perf_counter()
+        indice = FuzzyIndex()
+        data = indice.construir(nombres)
+        construccion = time.perf_counter() - inicio
+        self.stdout.write(
+            f"Índice: {len(nombres)} productos, {len(data['palabras'])} palabras, "
+            f"{len(data['bigramas'])} bigramas, construido en {construccion:.2f}s"
+        )
+
+        tiempos = []
+        aciertos = 0
+        for _ in range(options['consultas']):
+            original = [rnd.choice(MUEBLES), rnd.choice(DETALLES)]
+            consulta = ' '.join(self._con_error(rnd, palabra) for palabra in original)
+            inicio = time.perf_counter()
+            corregida = indice.corregir(consulta, data)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+            if (corregida or consulta) == ' '.join(original):
+                aciertos += 1
+
+        tiempos.sort()
+        percentil = lambda p: tiempos[min(len(tiempos) - 1, int(len(tiempos) * p))]
+        self.stdout.write(
+            f"{len(tiempos)} consultas: media {statistics.mean(tiempos):.3f} ms, "
+            f"p50 {percentil(0.5):.3f} ms, p95 {percentil(0.95):.3f} ms, p99 {percentil(0.99):.3f} ms"
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Corregidas a la palabra original: {aciertos / len(tiempos):.1%}"
+        ))
@@ -0,0 +1,134 @@
+import time
+from itertools import chain
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from productos.models import DetallePedido, RecomendacionProducto, Wishlist
+
+
+def coocurrencias(pedidos, productos, top_k=12, max_por_pedido=50, minimo=1):
+    """
+    Top-k de productos que aparecen juntos a partir de líneas de pedido
+    (arreglos paralelos pedido_id, producto_id; sirve igual para wishlists:
+    cada wishlist es un "pedido"). Los pares de cada pedido
+    se generan por desplazamiento sobre las líneas ordenadas por pedido
+    (una pasada vectorizada por distancia dentro del pedido) y se cuentan
+    con np.unique, sin matriz densa. El puntaje es la similitud coseno
+    conteo / sqrt(frecuencia_a * frecuencia_b), que no premia solo a los
+    productos más vendidos. Devuelve {producto_id: [ids relacionados]}.
+    """
+    if len(pedidos) == 0:
+        return {}
+    ids, columna = np.unique(productos, return_inverse=True)
+    n = len(ids)
+
+    # Ordenar por pedido y producto y quitar líneas repetidas
+    orden = np.lexsort((columna, pedidos))
+    pedidos = pedidos[orden]
+    columna = columna[orden]
+    distintas = np.ones(len(pedidos), dtype=bool)
+    distintas[1:] = (pedidos[1:] != pedidos[:-1]) | (columna[1:] != columna[:-1])
+    pedidos = pedidos[distintas]
+    columna = columna[distintas]
+
+    # Número de grupo (pedido) y puesto de cada línea dentro de su pedido
+    inicio = np.ones(len(pedidos), dtype=bool)
+    inicio[1:] = pedidos[1:] != pedidos[:-1]
+    grupo = np.cumsum(inicio) - 1
+    puesto = np.arange(len(pedidos)) - np.flatnonzero(inicio)[grupo]
+    # Pedidos enormes (compras de mayoreo) se recortan: aportan poco y cuestan O(k^2)
+    dentro = puesto < max_por_pedido
+    grupo = grupo[dentro]
+    columna = columna[dentro]
+    frecuencia = np.bincount(columna, minlength=n)
+
+    claves = []
+    for distancia in range(1, max_por_pedido):
+        mismo = grupo[distancia:] == grupo[:-distancia]
+        if not mismo.any():
+            break  # ningún pedido tiene tantas líneas
+        a = columna[:-distancia][mismo]
+        b = columna[distancia:][mismo]
+        claves.append(a * n + b)
+        claves.append(b * n + a)
+    if not claves:
+        return {}
+    pares, conteo = np.unique(np.concatenate(claves), return_counts=True)
+    suficientes = conteo >= minimo
+    pares = pares[suficientes]
+    conteo = conteo[suficientes]
+    a = pares // n
+    b = pares % n
+    puntaje = conteo / np.sqrt(frecuencia[a] * frecuencia[b])
+
+    # Por producto: mayor puntaje, luego más compras juntas, luego id
+    orden = np.lexsort((b, -conteo, -puntaje, a))
+    a = a[orden]
+    b = b[orden]
+    inicio = np.ones(len(a), dtype=bool)
+    inicio[1:] = a[1:] != a[:-1]
+    comienzos = np.flatnonzero(inicio)
+    puesto = np.arange(len(a)) - np.repeat(comienzos, np.diff(np.append(comienzos, len(a))))
+    elegidos = puesto < top_k
+    a = ids[a[elegidos]]
+    b = ids[b[elegidos]]
+
+    cortes = np.flatnonzero(a[1:] != a[:-1]) + 1
+    return {
+        int(grupo_a[0]): grupo_b.tolist()
+        for grupo_a, grupo_b in zip(np.split(a, cortes), np.split(b, cortes))
+    }
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los productos comprados juntos (pedidos) y guardados juntos (wishlists).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=12, help='Relacionados a guardar por producto')
+        parser.add_argument('--max-por-pedido', type=int, default=50)
+        parser.add_argument('--minimo', type=int, default=1, help='Mínimo de pedidos en común')
+
+    def _calcular(self, lineas, options):
+        """top-k por producto para un queryset de pares (grupo_id, producto_id)"""
+        # Se llenan los arreglos directamente desde el cursor, sin listas intermedias
+        datos = np.fromiter(
+            chain.from_iterable(lineas.iterator(chunk_size=20000)),
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        resultado = coocurrencias(
+            datos[:, 0], datos[:, 1],
+            top_k=options['top'],
+            max_por_pedido=options['max_por_pedido'],
+            minimo=options['minimo'],
+        )
+        return len(datos), resultado
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        total_pedidos, comprados = self._calcular(
+            DetallePedido.objects.exclude(pedido__estado='cancelado').values_list('pedido_id', 'producto_id'),
+            options,
+        )
+        total_wishlists, guardados = self._calcular(
+            Wishlist.productos.through.objects.values_list('wishlist_id', 'producto_id'),
+            options,
+        )
+        calculo = time.perf_counter() - inicio
+
+        with transaction.atomic():
+            RecomendacionProducto.objects.all().delete()
+            RecomendacionProducto.objects.bulk_create(
+                (RecomendacionProducto(
+                    producto_id=producto_id,
+                    relacionados=comprados.get(producto_id, []),
+                    guardados_juntos=guardados.get(producto_id, []),
+                ) for producto_id in comprados.keys() | guardados.keys()),
+                batch_size=1000,
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'{total_pedidos} líneas de pedido, {total_wishlists} favoritos, '
+            f'{len(comprados.keys() | guardados.keys())} productos con recomendaciones '
+            f'(cálculo {calculo:.1f} s, total {time.perf_counter() - inicio:.1f} s)'
+        ))
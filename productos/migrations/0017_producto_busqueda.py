@@ -0,0 +1,65 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:20
+
+import unicodedata
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+
+
+def _normalizar(text):
+    if not isinstance(text, str):
+        return ''
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+    return text.strip().lower()
+
+
+def poblar_busqueda(apps, schema_editor):
+    Producto = apps.get_model('productos', 'Producto')
+    filas = Producto.objects.values_list('id', 'nombre', 'descripcion', 'categoria__nombre')
+    lote = []
+    for producto_id, nombre, descripcion, categoria in filas.iterator(chunk_size=500):
+        producto = Producto(pk=producto_id, nombre_normalizado=_normalizar(nombre))
+        producto.vector_busqueda = (
+            SearchVector(models.Value(_normalizar(nombre), output_field=models.TextField()), weight='A', config='spanish')
+            + SearchVector(models.Value(_normalizar(categoria), output_field=models.TextField()), weight='B', config='spanish')
+            + SearchVector(models.Value(_normalizar(descripcion), output_field=models.TextField()), weight='C', config='spanish')
+        )
+        lote.append(producto)
+        if len(lote) >= 500:
+            Producto.objects.bulk_update(lote, ['nombre_normalizado', 'vector_busqueda'])
+            lote = []
+    if lote:
+        Producto.objects.bulk_update(lote, ['nombre_normalizado', 'vector_busqueda'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0016_pedido_detallepedido_resumenpedido'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='producto',
+            name='nombre_normalizado',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='vector_busqueda',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(poblar_busqueda, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='producto',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['vector_busqueda'], name='producto_vector_busqueda_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['nombre_normalizado'], name='producto_nombre_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0017_producto_busqueda'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['activo', '-ventas', '-fecha_creacion', '-id'], name='producto_orden_ventas_idx'),
+        ),
+    ]
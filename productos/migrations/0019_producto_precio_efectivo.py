@@ -0,0 +1,35 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:25
+
+from django.db import migrations, models
+
+
+def poblar_precio_efectivo(apps, schema_editor):
+    Producto = apps.get_model('productos', 'Producto')
+    Producto.objects.update(precio_efectivo=models.Case(
+        models.When(oferta_activa=True, precio_oferta__gt=0, then=models.F('precio_oferta')),
+        default=models.F('precio'),
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0018_producto_orden_ventas_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='precio_efectivo',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, help_text='Precio que paga el cliente (precio_actual), para ordenar y filtrar', max_digits=10),
+        ),
+        migrations.RunPython(poblar_precio_efectivo, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['activo', 'precio_efectivo', 'id'], name='producto_precio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['activo', 'categoria', 'precio_efectivo', 'id'], name='producto_cat_precio_idx'),
+        ),
+    ]
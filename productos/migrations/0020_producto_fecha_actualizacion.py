@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0019_producto_precio_efectivo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
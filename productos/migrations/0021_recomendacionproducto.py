@@ -0,0 +1,27 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:44
+
+import django.contrib.postgres.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0020_producto_fecha_actualizacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecomendacionProducto',
+            fields=[
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='recomendacion', serialize=False, to='productos.producto')),
+                ('relacionados', django.contrib.postgres.fields.ArrayField(base_field=models.PositiveIntegerField(), default=list, size=None)),
+                ('fecha_calculo', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Recomendación de Producto',
+                'verbose_name_plural': 'Recomendaciones de Productos',
+            },
+        ),
+    ]
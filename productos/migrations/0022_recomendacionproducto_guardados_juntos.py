@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:46
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0021_recomendacionproducto'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recomendacionproducto',
+            name='guardados_juntos',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.PositiveIntegerField(), default=list, size=None),
+        ),
+    ]
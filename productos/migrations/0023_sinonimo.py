@@ -0,0 +1,40 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:47
+
+from django.db import migrations, models
+
+SINONIMOS_INICIALES = [
+    'sofa, sillon, love seat',
+    'buro, mesa de noche',
+    'tapete, alfombra',
+    'ropero, closet, armario',
+    'librero, estante, estanteria',
+    'comoda, cajonera',
+]
+
+
+def crear_sinonimos(apps, schema_editor):
+    Sinonimo = apps.get_model('productos', 'Sinonimo')
+    Sinonimo.objects.bulk_create(Sinonimo(terminos=terminos) for terminos in SINONIMOS_INICIALES)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0022_recomendacionproducto_guardados_juntos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Sinonimo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('terminos', models.CharField(help_text='Palabras o frases equivalentes separadas por comas, p.ej. "sofa, sillon, love seat"', max_length=255)),
+                ('activo', models.BooleanField(default=True)),
+            ],
+            options={
+                'verbose_name': 'Sinónimo',
+                'verbose_name_plural': 'Sinónimos',
+            },
+        ),
+        migrations.RunPython(crear_sinonimos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-18 14:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0023_sinonimo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImagenDerivada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original', models.CharField(db_index=True, max_length=255)),
+                ('formato', models.CharField(max_length=10)),
+                ('ancho', models.PositiveIntegerField()),
+                ('alto', models.PositiveIntegerField()),
+                ('archivo', models.FileField(max_length=255, upload_to='derivadas/')),
+            ],
+            options={
+                'verbose_name': 'Imagen Derivada',
+                'verbose_name_plural': 'Imágenes Derivadas',
+            },
+        ),
+    ]
@@ -71,7 +71,5 @@ class ProductMixin:
         """
         Devuelve el producto y sus imágenes listas para mostrar.
         """
-        from .utils import prepare_product_images
-        producto = get_object_or_404(Producto, id=producto_id)
-        imagenes = prepare_product_images(producto)
-        return producto, imagenes 
+        producto = get_object_or_404(Producto.objects.para_grid(), id=producto_id)
+        return producto, producto.imagenes_list
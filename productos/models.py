@@ -2,9 +2,15 @@ from django.db import models
 from django.contrib.auth.models import User
 from decimal import Decimal
 from django.conf import settings
+import json
 import uuid
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
+from django.utils import timezone
+from django.utils.functional import cached_property
 from django.dispatch import receiver
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.contrib.postgres.fields import ArrayField
 
 class Categoria(models.Model):
     nombre = models.CharField(max_length=50)
@@ -17,6 +23,50 @@ class Categoria(models.Model):
     class Meta:
         verbose_name_plural = "Categorias"
 
+class ProductoQuerySet(models.QuerySet):
+    """
+    Operaciones masivas que mantienen los campos calculados de Producto
+    (update() no pasa por save() ni envía señales).
+    """
+
+    def recalcular_precio_efectivo(self):
+        filas = self.update(
+            precio_efectivo=Producto.expresion_precio_actual(),
+            fecha_actualizacion=timezone.now(),
+        )
+        from .services.cache_service import CacheService
+        CacheService.bump_version('catalogo')
+        return filas
+
+    def cambiar_oferta(self, activa):
+        """activa o desactiva la oferta de todos los productos del queryset"""
+        self.update(oferta_activa=activa)
+        return self.recalcular_precio_efectivo()
+
+    def tocar(self):
+        """marca los productos como modificados (invalida sus tarjetas cacheadas)"""
+        return self.update(fecha_actualizacion=timezone.now())
+
+    def para_grid(self):
+        """
+        Carga en bloque categoría, inventario e imágenes (por orden) de los
+        productos: un número fijo de consultas sin importar cuántos sean.
+        El vector de búsqueda no se muestra y no se trae.
+        """
+        return self.select_related('categoria', 'inventario').defer('vector_busqueda').prefetch_related(
+            models.Prefetch(
+                'imagenes_producto',
+                queryset=ImagenProducto.objects.order_by('orden', 'fecha_creacion'),
+                to_attr='imagenes_cargadas',
+            )
+        )
+
+    def en_orden(self, ids):
+        """productos con esos ids en ese mismo orden (los que no estén se omiten)"""
+        productos = self.in_bulk(ids)
+        return [productos[producto_id] for producto_id in ids if producto_id in productos]
+
+
 class Producto(models.Model):
     nombre = models.CharField(max_length=100)
     descripcion = models.TextField(blank=True, null=True)
@@ -24,23 +74,108 @@ class Producto(models.Model):
     precio_oferta = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
     oferta_activa = models.BooleanField(default=False)
     fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
     activo = models.BooleanField(default=True)
     categoria = models.ForeignKey(Categoria, on_delete=models.SET_NULL, null=True, related_name='productos')
     imagen_principal = models.ImageField(upload_to='productos/', null=False, blank=False, default='productos/default.jpg')
     ventas = models.PositiveIntegerField(default=0, help_text='Cantidad de veces que este producto ha sido vendido')
+    precio_efectivo = models.DecimalField(max_digits=10, decimal_places=2, default=0, editable=False, help_text='Precio que paga el cliente (precio_actual), para ordenar y filtrar')
+
+    # Campos de búsqueda (se mantienen en save() y por señales)
+    nombre_normalizado = models.CharField(max_length=100, blank=True, editable=False)
+    vector_busqueda = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['vector_busqueda'], name='producto_vector_busqueda_idx'),
+            GinIndex(fields=['nombre_normalizado'], name='producto_nombre_trgm_idx', opclasses=['gin_trgm_ops']),
+            # Orden estable del listado (paginación por cursor)
+            models.Index(fields=['activo', '-ventas', '-fecha_creacion', '-id'], name='producto_orden_ventas_idx'),
+            # Orden y filtros por precio efectivo (todo el catálogo y por categoría)
+            models.Index(fields=['activo', 'precio_efectivo', 'id'], name='producto_precio_idx'),
+            models.Index(fields=['activo', 'categoria', 'precio_efectivo', 'id'], name='producto_cat_precio_idx'),
+        ]
+
+    objects = ProductoQuerySet.as_manager()
 
     def __str__(self):
         return self.nombre
 
+    def save(self, *args, **kwargs):
+        from .utils import normalizar_texto
+        self.nombre_normalizado = normalizar_texto(self.nombre)
+        self.precio_efectivo = self.precio_actual()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if 'nombre' in update_fields:
+                update_fields.add('nombre_normalizado')
+            if update_fields & {'precio', 'precio_oferta', 'oferta_activa'}:
+                update_fields.add('precio_efectivo')
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+
     def precio_actual(self):
         if self.oferta_activa and self.precio_oferta:
             return self.precio_oferta
         return self.precio
 
+    @staticmethod
+    def expresion_precio_actual():
+        """
+        Expresión SQL equivalente a precio_actual()
+        """
+        return models.Case(
+            models.When(oferta_activa=True, precio_oferta__gt=0, then=models.F('precio_oferta')),
+            default=models.F('precio'),
+        )
+
     @property
     def imagenes(self):
         return self.imagenes_producto.all()
 
+    @cached_property
+    def imagenes_list(self):
+        """
+        Imágenes para mostrar: la principal y luego las secundarias que no la
+        repiten. Usa las imágenes precargadas por para_grid() si las hay.
+        """
+        secundarias = getattr(self, 'imagenes_cargadas', None)
+        if secundarias is None:
+            secundarias = list(self.imagenes)
+        imagenes = []
+        principal_url = self.imagen_principal.url if self.imagen_principal else None
+        if self.imagen_principal:
+            imagenes.append({'imagen': self.imagen_principal})
+        for img in secundarias:
+            if img.imagen.url != principal_url:
+                imagenes.append({'imagen': img.imagen})
+        return imagenes
+
+    @cached_property
+    def imagenes_json(self):
+        """imagenes_list como JSON para los carruseles de las tarjetas ([{"url": ...}])"""
+        return self.json_imagenes(640)
+
+    @cached_property
+    def imagenes_json_grande(self):
+        """imagenes_list como JSON para el carrusel del modal"""
+        return self.json_imagenes(1024)
+
+    def json_imagenes(self, ancho, variantes=None):
+        """
+        URLs de las versiones reducidas (ImageService) que cubren `ancho`;
+        `variantes`: el dict de variantes_many si ya se consultó con otras
+        """
+        from .services.image_service import ImageService
+        imagenes = [img['imagen'] for img in self.imagenes_list]
+        if variantes is None:
+            variantes = ImageService.variantes_many(img.name for img in imagenes)
+        return json.dumps([
+            {'url': ImageService.miniatura(img, ancho, variantes.get(img.name, []))}
+            for img in imagenes
+        ])
+
 class ImagenProducto(models.Model):
     producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='imagenes_producto')
     imagen = models.ImageField(upload_to='productos/')
@@ -235,6 +370,54 @@ class ResumenPedido(models.Model):
         """Retorna el subtotal formateado como string"""
         return f"${self.subtotal:,.2f}"
 
+class ImagenDerivada(models.Model):
+    """Versión reducida de una imagen subida, generada por ImageService"""
+    original = models.CharField(max_length=255, db_index=True)
+    formato = models.CharField(max_length=10)
+    ancho = models.PositiveIntegerField()
+    alto = models.PositiveIntegerField()
+    archivo = models.FileField(upload_to='derivadas/', max_length=255)
+
+    class Meta:
+        verbose_name = 'Imagen Derivada'
+        verbose_name_plural = 'Imágenes Derivadas'
+
+    def __str__(self):
+        return f"{self.original} ({self.formato} {self.ancho}px)"
+
+class Sinonimo(models.Model):
+    """Grupo de palabras o frases equivalentes para la búsqueda ("buro, mesa de noche")"""
+    terminos = models.CharField(
+        max_length=255,
+        help_text='Palabras o frases equivalentes separadas por comas, p.ej. "sofa, sillon, love seat"',
+    )
+    activo = models.BooleanField(default=True)
+
+    class Meta:
+        verbose_name = 'Sinónimo'
+        verbose_name_plural = 'Sinónimos'
+
+    def __str__(self):
+        return self.terminos
+
+    def lista_terminos(self):
+        return [termino.strip() for termino in self.terminos.split(',') if termino.strip()]
+
+class RecomendacionProducto(models.Model):
+    """Productos afines a este, calculados por recalcular_recomendaciones"""
+    producto = models.OneToOneField(Producto, on_delete=models.CASCADE, primary_key=True, related_name='recomendacion')
+    # Ids de productos relacionados, del más al menos afín
+    relacionados = ArrayField(models.PositiveIntegerField(), default=list)  # comprados juntos
+    guardados_juntos = ArrayField(models.PositiveIntegerField(), default=list)  # en las mismas wishlists
+    fecha_calculo = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Recomendación de Producto'
+        verbose_name_plural = 'Recomendaciones de Productos'
+
+    def __str__(self):
+        return f"Recomendaciones de {self.producto_id}"
+
 # Aqui se crearan los resumenes automaticamente
 
 @receiver(post_save, sender=Pedido)
@@ -261,3 +444,114 @@ def actualizar_totales_resumen(sender, instance, created, **kwargs):
             resumen.total = resumen.subtotal
             resumen.save()
             print(f"Totales actualizados para resumen {resumen.numero_resumen}")
+
+
+# Aqui se mantiene el indice de busqueda de productos
+
+CAMPOS_BUSQUEDA = {'nombre', 'descripcion', 'categoria'}
+
+@receiver(post_save, sender=Producto)
+def actualizar_vector_producto(sender, instance, update_fields=None, **kwargs):
+    """recalcula el vector de busqueda cuando cambia el texto del producto"""
+    if update_fields is not None and not CAMPOS_BUSQUEDA & set(update_fields):
+        return
+    from .services.search_service import SearchService
+    SearchService.actualizar_vectores(Producto.objects.filter(pk=instance.pk))
+
+@receiver(post_save, sender=Categoria)
+def actualizar_vector_categoria(sender, instance, **kwargs):
+    """recalcula los vectores de los productos de la categoria"""
+    from .services.search_service import SearchService
+    SearchService.actualizar_vectores(instance.productos.all())
+
+@receiver(pre_delete, sender=Categoria)
+def recordar_productos_categoria(sender, instance, **kwargs):
+    """el borrado deja sus productos sin categoria (update masivo, sin señales)"""
+    instance._productos_ids = list(instance.productos.values_list('id', flat=True))
+
+@receiver(post_delete, sender=Categoria)
+def actualizar_vector_categoria_borrada(sender, instance, **kwargs):
+    """quita el nombre de la categoria borrada de los vectores de sus productos"""
+    from .services.search_service import SearchService
+    SearchService.actualizar_vectores(Producto.objects.filter(pk__in=getattr(instance, '_productos_ids', [])))
+
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+def invalidar_categorias(sender, instance, **kwargs):
+    """invalida las estructuras en memoria que dependen de las categorias"""
+    from .services.cache_service import CacheService
+    CacheService.bump_version('categorias')
+
+# El stock (Inventario) no entra en nada cacheado: no invalida el catalogo
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+def invalidar_catalogo(sender, instance, **kwargs):
+    """invalida los datos derivados del catalogo (facetas, caches)"""
+    from .services.cache_service import CacheService
+    CacheService.bump_version('catalogo')
+
+# Lo que forma el vocabulario del buscador (FuzzyIndex, AutocompleteIndex)
+CAMPOS_NOMBRES = ('nombre', 'categoria_id', 'activo')
+
+@receiver(pre_save, sender=Producto)
+def detectar_cambio_nombres(sender, instance, update_fields=None, **kwargs):
+    """marca si el guardado cambia nombre, categoria o activo del producto"""
+    if update_fields is not None and not {'nombre', 'categoria', 'activo'} & set(update_fields):
+        instance._cambia_nombres = False
+        return
+    anterior = Producto.objects.filter(pk=instance.pk).values_list(*CAMPOS_NOMBRES).first() if instance.pk else None
+    instance._cambia_nombres = anterior != tuple(getattr(instance, campo) for campo in CAMPOS_NOMBRES)
+
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+def invalidar_nombres(sender, instance, **kwargs):
+    """el vocabulario del buscador se rearma solo si cambian los nombres"""
+    if getattr(instance, '_cambia_nombres', True):
+        from .services.cache_service import CacheService
+        CacheService.bump_version('nombres')
+
+# Campos de imagen que tienen versiones reducidas (ver ImageService)
+CAMPOS_IMAGEN = {
+    'productos.Producto': 'imagen_principal',
+    'productos.ImagenProducto': 'imagen',
+    'productos.BannerPromocional': 'imagen_lateral',
+    'blog.Blog': 'imagen',
+}
+
+@receiver(post_save, sender=Producto)
+@receiver(post_save, sender=ImagenProducto)
+@receiver(post_save, sender=BannerPromocional)
+@receiver(post_save, sender='blog.Blog')
+def generar_imagenes_derivadas(sender, instance, update_fields=None, **kwargs):
+    """genera las versiones WebP de la imagen si es nueva"""
+    campo = CAMPOS_IMAGEN[sender._meta.label]
+    if update_fields is not None and campo not in update_fields:
+        return
+    from .services.image_service import ImageService
+    ImageService.asegurar(getattr(instance, campo))
+
+@receiver(post_save, sender=Sinonimo)
+@receiver(post_delete, sender=Sinonimo)
+def invalidar_sinonimos(sender, instance, **kwargs):
+    """el mapa de sinonimos de cada proceso se vuelve a armar"""
+    from .services.cache_service import CacheService
+    CacheService.bump_version('sinonimos')
+
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+def invalidar_ranking(sender, instance, **kwargs):
+    """el ranking de ventas se rearma si cambia un producto (activo, categoria)"""
+    from .services.cache_service import CacheService
+    CacheService.bump_version('ranking')
+
+@receiver(post_save, sender=ImagenProducto)
+@receiver(post_delete, sender=ImagenProducto)
+def tocar_producto_imagen(sender, instance, **kwargs):
+    """la tarjeta cacheada del producto muestra sus imagenes"""
+    Producto.objects.filter(pk=instance.producto_id).tocar()
+
+@receiver(post_save, sender=Categoria)
+@receiver(pre_delete, sender=Categoria)
+def tocar_productos_categoria(sender, instance, **kwargs):
+    """la tarjeta cacheada del producto muestra el nombre de su categoria"""
+    instance.productos.all().tocar()
@@ -0,0 +1,116 @@
+import heapq
+from bisect import bisect_left
+
+from django.urls import reverse
+
+from productos.models import Categoria, Producto
+from productos.services.cache_service import ProcessIndex
+from productos.utils import normalizar_texto
+
+
+class AutocompleteIndex(ProcessIndex):
+    """
+    Índice de prefijos en memoria para el autocompletado del buscador.
+    Guarda ordenados el nombre normalizado de cada producto activo y cada
+    final del nombre que empieza en una palabra ("mesa de centro" también
+    se encuentra por "centro"). Se reconstruye al cambiar nombres o
+    categorías, y por el orden de ventas a lo sumo una vez por minuto.
+    """
+
+    versiones = ('nombres', 'categorias')
+    # Orden por ventas: con hasta ESPERA_DIFERIDAS segundos de atraso
+    versiones_diferidas = ('ventas',)
+
+    # Prefijos con más claves que esto guardan su top precalculado; el resto
+    # se resuelve recorriendo a lo sumo UMBRAL claves (presupuesto de latencia)
+    UMBRAL = 1000
+    MAX_SUGERENCIAS = 20
+
+    def _precalcular(self, claves, posiciones):
+        """
+        Top de cada prefijo "pesado", bajando por la lista ordenada: un
+        prefijo solo puede ser pesado si el prefijo que lo contiene lo es.
+        """
+        tops = {}
+        pendientes = [(0, len(claves), 0)]
+        while pendientes:
+            inicio, fin, largo = pendientes.pop()
+            i = inicio
+            while i < fin:
+                if len(claves[i]) <= largo:
+                    i += 1
+                    continue
+                prefijo = claves[i][:largo + 1]
+                j = bisect_left(claves, prefijo + '\uffff', i, fin)
+                if j - i > self.UMBRAL:
+                    tops[prefijo] = heapq.nsmallest(self.MAX_SUGERENCIAS, set(posiciones[i:j]))
+                    pendientes.append((i, j, largo + 1))
+                i = j
+        return tops
+
+    def build(self):
+        filas = (
+            Producto.objects.filter(activo=True)
+            .order_by('-ventas', '-id')
+            .values_list('id', 'nombre', 'nombre_normalizado')
+        )
+        # El índice en la lista ya es el orden de ventas: menor es mejor
+        productos = []
+        entradas = []
+        for posicion, (producto_id, nombre, nombre_norm) in enumerate(filas):
+            productos.append({
+                'nombre': nombre,
+                'url': reverse('productos:detalle_producto', args=[producto_id]),
+            })
+            palabras = (nombre_norm or normalizar_texto(nombre)).split()
+            for inicio in range(len(palabras)):
+                entradas.append((' '.join(palabras[inicio:]), posicion))
+        entradas.sort()
+        claves = [clave for clave, _ in entradas]
+        posiciones = [posicion for _, posicion in entradas]
+
+        categorias = []
+        for slug, nombre in Categoria.objects.order_by('nombre').values_list('slug', 'nombre'):
+            palabras = normalizar_texto(nombre).split()
+            categorias.append({
+                'palabras': [' '.join(palabras[i:]) for i in range(len(palabras))],
+                'nombre': nombre,
+                'url': reverse('productos:lista_por_categoria', args=[slug]),
+            })
+
+        return {
+            'claves': claves,
+            'posiciones': posiciones,
+            'precalculados': self._precalcular(claves, posiciones),
+            'productos': productos,
+            'categorias': categorias,
+        }
+
+    def sugerir(self, query, limite=8, limite_categorias=3):
+        """
+        Sugerencias para el texto escrito: categorías y productos más
+        vendidos cuyo nombre (o alguna de sus palabras) empieza con él.
+        """
+        prefijo = ' '.join(normalizar_texto(query).split())
+        limite = min(limite, self.MAX_SUGERENCIAS)
+        if not prefijo:
+            return {'categorias': [], 'productos': []}
+        data = self.get()
+
+        candidatos = data['precalculados'].get(prefijo)
+        if candidatos is None:
+            claves = data['claves']
+            inicio = bisect_left(claves, prefijo)
+            fin = bisect_left(claves, prefijo + '\uffff', inicio, min(len(claves), inicio + self.UMBRAL + 1))
+            candidatos = set(data['posiciones'][inicio:fin])
+
+        productos = [data['productos'][posicion] for posicion in heapq.nsmallest(limite, candidatos)]
+        categorias = [
+            {'nombre': cat['nombre'], 'url': cat['url']}
+            for cat in data['categorias']
+            if any(palabras.startswith(prefijo) for palabras in cat['palabras'])
+        ][:limite_categorias]
+        return {'categorias': categorias, 'productos': productos}
+
+
+autocomplete_index = AutocompleteIndex()
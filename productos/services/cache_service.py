@@ -0,0 +1,134 @@
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+class CacheService:
+    """
+    Versiones compartidas (en la cache de Django) para invalidar datos
+    derivados del catálogo en todos los workers. Solo llegan a todos si la
+    cache es compartida (REDIS_URL); ver el chequeo productos.E001.
+    """
+
+    @staticmethod
+    def _version_key(nombre):
+        return f'productos:version:{nombre}'
+
+    @staticmethod
+    def get_versions(*nombres):
+        """
+        Devuelve la tupla de versiones actuales de los nombres dados
+        """
+        keys = [CacheService._version_key(nombre) for nombre in nombres]
+        actuales = cache.get_many(keys)
+        for key in keys:
+            if key not in actuales:
+                # Valor inicial basado en el reloj para no repetir una versión
+                # anterior si la clave fue expulsada de la cache
+                cache.add(key, int(time.time() * 1000), timeout=None)
+                actuales[key] = cache.get(key)
+        return tuple(actuales[key] for key in keys)
+
+    @staticmethod
+    def bump_version(nombre):
+        """
+        Incrementa la versión cuando la transacción actual se confirma
+        """
+        def _incrementar():
+            key = CacheService._version_key(nombre)
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, int(time.time() * 1000), timeout=None)
+        transaction.on_commit(_incrementar)
+
+    @staticmethod
+    def calcular_una_vez(key, calcular, timeout, espera=2.0):
+        """
+        Calcula y guarda un valor que falta en la cache, de a un worker por
+        vez: el que toma el candado (cache.add) calcula y los demás esperan
+        a que aparezca. Si la espera se agota se calcula igual.
+        """
+        candado = f'{key}:calculando'
+        if cache.add(candado, 1, timeout=30):
+            try:
+                valor = calcular()
+                cache.set(key, valor, timeout)
+            finally:
+                cache.delete(candado)
+            return valor
+        limite = time.monotonic() + espera
+        while time.monotonic() < limite:
+            time.sleep(0.05)
+            valor = cache.get(key)
+            if valor is not None:
+                return valor
+        return calcular()
+
+    @staticmethod
+    def _contador_key(nombre):
+        return f'productos:contador:{nombre}'
+
+    @staticmethod
+    def contar(nombre):
+        """
+        Suma 1 a un contador compartido (estadísticas de aciertos de cache)
+        """
+        key = CacheService._contador_key(nombre)
+        if not cache.add(key, 1, timeout=None):
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, 1, timeout=None)
+
+    @staticmethod
+    def get_contadores(*nombres):
+        """
+        Valores actuales de los contadores dados (0 si no existen)
+        """
+        keys = {nombre: CacheService._contador_key(nombre) for nombre in nombres}
+        actuales = cache.get_many(keys.values())
+        return {nombre: actuales.get(key, 0) for nombre, key in keys.items()}
+
+
+class ProcessIndex:
+    """
+    Estructura en memoria de cada proceso que se reconstruye solo cuando
+    cambia alguna de sus versiones (ver CacheService).
+    """
+
+    versiones = ()
+    # Versiones que cambian muy seguido (p.ej. 'ventas', una por compra): su
+    # cambio se acepta con hasta ESPERA_DIFERIDAS segundos de atraso, así
+    # el índice se reconstruye a lo sumo una vez por intervalo
+    versiones_diferidas = ()
+    ESPERA_DIFERIDAS = 60
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._data = None
+        self._construido = 0.0
+
+    def build(self):
+        raise NotImplementedError
+
+    def _vencido(self, version):
+        if self._data is None:
+            return True
+        cantidad = len(self.versiones)
+        if version[:cantidad] != self._version[:cantidad]:
+            return True
+        return version != self._version and time.monotonic() - self._construido >= self.ESPERA_DIFERIDAS
+
+    def get(self):
+        version = CacheService.get_versions(*self.versiones, *self.versiones_diferidas)
+        if self._vencido(version):
+            with self._lock:
+                if self._vencido(version):
+                    self._data = self.build()
+                    self._version = version
+                    self._construido = time.monotonic()
+        return self._data
@@ -0,0 +1,202 @@
+import datetime
+import math
+import random
+from array import array
+from bisect import bisect_left
+from decimal import Decimal
+
+from productos.models import Categoria, Producto
+from productos.services.cache_service import ProcessIndex
+from productos.services.facet_service import FacetService
+from productos.services.pagination_service import KeysetPaginator
+
+EPOCA = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+class CatalogSnapshot(ProcessIndex):
+    """
+    Copia de solo lectura del catálogo activo en cada proceso, en arreglos
+    paralelos (una posición por producto) construidos con una sola consulta.
+    Sirve los listados sin búsqueda de texto: filtra, ordena y pagina en
+    memoria y la base de datos solo trae los productos de la página.
+    Categoría y ofertas tienen sus posiciones precalculadas por orden; un
+    rango de precio se resuelve recorriendo esas posiciones desde el cursor
+    (lineal en las filas descartadas, sin índice por precio).
+    Se reconstruye cuando cambia la versión del catálogo o de categorías, y
+    por las ventas (orden "más vendidos") a lo sumo una vez por minuto.
+    """
+
+    versiones = ('catalogo', 'categorias')
+    # Orden por ventas: con hasta ESPERA_DIFERIDAS segundos de atraso
+    versiones_diferidas = ('ventas',)
+
+    # Órdenes del listado que se pueden servir desde memoria (mismos que la vista)
+    ORDENES = {
+        ('-ventas', '-fecha_creacion', '-id'): 'ventas',
+        ('precio_efectivo', 'id'): 'precio_asc',
+        ('-precio_efectivo', '-id'): 'precio_desc',
+    }
+
+    def build(self):
+        filas = Producto.objects.filter(activo=True).order_by('id').values_list(
+            'id', 'nombre', 'precio_efectivo', 'oferta_activa', 'categoria_id',
+            'ventas', 'fecha_creacion',
+        )
+        ids = array('q')
+        nombres = []
+        centavos = array('q')
+        ofertas = bytearray()
+        categorias = array('q')
+        ventas = array('q')
+        creacion = array('q')
+        for producto_id, nombre, precio, oferta, categoria_id, vendidos, fecha in filas:
+            ids.append(producto_id)
+            nombres.append(nombre)
+            centavos.append(int((precio or 0) * 100))
+            ofertas.append(1 if oferta else 0)
+            categorias.append(categoria_id or 0)
+            ventas.append(vendidos)
+            creacion.append((fecha - EPOCA) // datetime.timedelta(microseconds=1))
+
+        filas = range(len(ids))
+        ordenes = {
+            'ventas': array('l', sorted(filas, key=lambda i: (-ventas[i], -creacion[i], -ids[i]))),
+            'precio_asc': array('l', sorted(filas, key=lambda i: (centavos[i], ids[i]))),
+        }
+        ordenes['precio_desc'] = array('l', reversed(ordenes['precio_asc']))
+        # posición de cada fila dentro de cada orden (para retomar desde un cursor)
+        # y, por orden, las posiciones de cada categoría y de las ofertas (en
+        # orden creciente), para no recorrer todo el catálogo al filtrar
+        posiciones = {}
+        por_categoria = {}
+        en_oferta = {}
+        for clave, orden in ordenes.items():
+            posiciones[clave] = array('l', bytes(orden.itemsize * len(orden)))
+            por_categoria[clave] = {}
+            en_oferta[clave] = array('l')
+            for posicion, fila in enumerate(orden):
+                posiciones[clave][fila] = posicion
+                por_categoria[clave].setdefault(categorias[fila], array('l')).append(posicion)
+                if ofertas[fila]:
+                    en_oferta[clave].append(posicion)
+        return {
+            'ids': ids,
+            'nombres': nombres,
+            'centavos': centavos,
+            'ofertas': ofertas,
+            'categorias': categorias,
+            'ventas': ventas,
+            'creacion': creacion,
+            'ordenes': ordenes,
+            'posiciones': posiciones,
+            'por_categoria': por_categoria,
+            'en_oferta': en_oferta,
+            'fila_por_id': {producto_id: fila for fila, producto_id in enumerate(ids)},
+            'categoria_por_slug': dict(Categoria.objects.values_list('slug', 'id')),
+        }
+
+    @staticmethod
+    def _valores_orden(data, fila, clave):
+        """valores de orden de una fila, como los devuelve la base de datos"""
+        producto_id = data['ids'][fila]
+        if clave == 'ventas':
+            fecha = EPOCA + datetime.timedelta(microseconds=data['creacion'][fila])
+            return [data['ventas'][fila], fecha, producto_id]
+        return [Decimal(data['centavos'][fila]) / 100, producto_id]
+
+    def ids_activos(self):
+        """ids de todos los productos activos (arreglo compartido, no modificar)"""
+        return self.get()['ids']
+
+    def muestra(self, k, excluir=()):
+        """
+        k ids de productos activos al azar y distintos, sin los de `excluir`.
+        Se sortean posiciones del arreglo de ids (costo según k, no según el
+        tamaño del catálogo); si quedan pocos disponibles se elige entre todos.
+        """
+        ids = self.ids_activos()
+        excluir = set(excluir)
+        if len(ids) <= 2 * (k + len(excluir)):
+            disponibles = [producto_id for producto_id in ids if producto_id not in excluir]
+            return random.sample(disponibles, min(k, len(disponibles)))
+        elegidos = []
+        vistos = set(excluir)
+        while len(elegidos) < k:
+            producto_id = ids[random.randrange(len(ids))]
+            if producto_id not in vistos:
+                vistos.add(producto_id)
+                elegidos.append(producto_id)
+        return elegidos
+
+    def pagina(self, categoria_slug, parametros, ordering, page_size, cursor=None):
+        """
+        Ids de la página y cursor de la siguiente, con la misma semántica que
+        KeysetPaginator sobre _filtrar_productos. None si no se puede servir
+        desde memoria (orden no soportado o cursor de otra versión).
+        """
+        clave = self.ORDENES.get(tuple(ordering))
+        if clave is None:
+            return None
+        data = self.get()
+        paginator = KeysetPaginator(Producto.objects.none(), ordering, page_size)
+
+        categoria_id = None
+        solo_ofertas = categoria_slug == 'ofertas'
+        if categoria_slug and not solo_ofertas:
+            categoria_id = data['categoria_por_slug'].get(categoria_slug)
+            if categoria_id is None:
+                return None  # la vista responde 404
+
+        minimo = maximo = None  # en centavos; maximo incluido
+        indice = FacetService.indice_rango(parametros.get('rango'))
+        if indice is not None:
+            _, _, desde, hasta = FacetService.RANGOS_PRECIO[indice]
+            if desde is not None:
+                minimo = desde * 100
+            if hasta is not None:
+                maximo = hasta * 100 - 1
+        if parametros.get('precio_min') is not None:
+            valor = math.ceil(parametros['precio_min'] * 100)
+            minimo = valor if minimo is None else max(minimo, valor)
+        if parametros.get('precio_max') is not None:
+            valor = math.floor(parametros['precio_max'] * 100)
+            maximo = valor if maximo is None else min(maximo, valor)
+
+        orden = data['ordenes'][clave]
+        inicio = 0
+        if cursor:
+            valores = paginator.decode_cursor(cursor)
+            if valores is not None:
+                fila = data['fila_por_id'].get(valores[-1])
+                if fila is None or self._valores_orden(data, fila, clave) != valores:
+                    return None
+                inicio = data['posiciones'][clave][fila] + 1
+
+        # Posiciones candidatas: la categoría o las ofertas (precalculadas) o
+        # todo el orden; el filtro de precio se aplica recorriendo desde ahí
+        if categoria_id is not None:
+            candidatas = data['por_categoria'][clave].get(categoria_id, ())
+        elif solo_ofertas:
+            candidatas = data['en_oferta'][clave]
+        else:
+            candidatas = range(len(orden))
+        centavos = data['centavos']
+        seleccion = []
+        for numero in range(bisect_left(candidatas, inicio), len(candidatas)):
+            fila = orden[candidatas[numero]]
+            if minimo is not None and centavos[fila] < minimo:
+                continue
+            if maximo is not None and centavos[fila] > maximo:
+                continue
+            seleccion.append(fila)
+            if len(seleccion) > page_size:
+                break
+
+        siguiente = None
+        if len(seleccion) > page_size:
+            seleccion = seleccion[:page_size]
+            siguiente = paginator.encode_valores(self._valores_orden(data, seleccion[-1], clave))
+        return [data['ids'][fila] for fila in seleccion], siguiente
+
+
+catalogo_snapshot = CatalogSnapshot()
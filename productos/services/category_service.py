@@ -0,0 +1,132 @@
+from collections import deque
+
+from productos.models import Categoria
+from productos.services.cache_service import ProcessIndex
+from productos.utils import normalizar_texto
+
+SIN_COINCIDENCIA = float('inf')
+
+
+class _Automata:
+    """
+    Aho-Corasick sobre los nombres normalizados. Cada estado guarda el menor
+    índice de categoría cuyo nombre termina en él (o en su cadena de fallos).
+    """
+
+    def __init__(self, patrones):
+        self.goto = [{}]
+        self.fail = [0]
+        self.salida = [SIN_COINCIDENCIA]
+        for texto, indice in patrones:
+            nodo = 0
+            for caracter in texto:
+                siguiente = self.goto[nodo].get(caracter)
+                if siguiente is None:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.salida.append(SIN_COINCIDENCIA)
+                    siguiente = len(self.goto) - 1
+                    self.goto[nodo][caracter] = siguiente
+                nodo = siguiente
+            self.salida[nodo] = min(self.salida[nodo], indice)
+
+        cola = deque(self.goto[0].values())
+        while cola:
+            nodo = cola.popleft()
+            for caracter, siguiente in self.goto[nodo].items():
+                cola.append(siguiente)
+                fallo = self.fail[nodo]
+                while fallo and caracter not in self.goto[fallo]:
+                    fallo = self.fail[fallo]
+                self.fail[siguiente] = self.goto[fallo].get(caracter, 0)
+                self.salida[siguiente] = min(self.salida[siguiente], self.salida[self.fail[siguiente]])
+
+    def buscar(self, texto):
+        """menor índice de patrón contenido en el texto"""
+        nodo = 0
+        mejor = SIN_COINCIDENCIA
+        for caracter in texto:
+            while nodo and caracter not in self.goto[nodo]:
+                nodo = self.fail[nodo]
+            nodo = self.goto[nodo].get(caracter, 0)
+            mejor = min(mejor, self.salida[nodo])
+        return mejor
+
+
+class _TrieSufijos:
+    """
+    Trie con todos los sufijos de los nombres: recorrerlo con el texto dice
+    si el texto es subcadena de algún nombre (y del primero en orden).
+    """
+
+    def __init__(self, patrones):
+        self.hijos = [{}]
+        self.minimo = [SIN_COINCIDENCIA]
+        for texto, indice in patrones:
+            for inicio in range(len(texto)):
+                nodo = 0
+                self.minimo[0] = min(self.minimo[0], indice)
+                for caracter in texto[inicio:]:
+                    siguiente = self.hijos[nodo].get(caracter)
+                    if siguiente is None:
+                        self.hijos.append({})
+                        self.minimo.append(SIN_COINCIDENCIA)
+                        siguiente = len(self.hijos) - 1
+                        self.hijos[nodo][caracter] = siguiente
+                    nodo = siguiente
+                    self.minimo[nodo] = min(self.minimo[nodo], indice)
+
+    def buscar(self, texto):
+        nodo = 0
+        for caracter in texto:
+            nodo = self.hijos[nodo].get(caracter)
+            if nodo is None:
+                return SIN_COINCIDENCIA
+        return self.minimo[nodo]
+
+
+class CategoryMatcher(ProcessIndex):
+    """
+    Detecta si una búsqueda se refiere claramente a una categoría.
+    Se construye una vez por proceso y se reconstruye al guardar o borrar
+    una Categoria; cada consulta es O(len(query)) y no toca la base de datos.
+    """
+
+    versiones = ('categorias',)
+
+    def build(self):
+        categorias = list(Categoria.objects.order_by('pk').values_list('slug', 'nombre'))
+        exactos = {}
+        nombres = []
+        for indice, (slug, nombre) in enumerate(categorias):
+            nombre_norm = normalizar_texto(nombre)
+            for clave in (nombre_norm, normalizar_texto(slug)):
+                exactos.setdefault(clave, indice)
+            if nombre_norm:
+                nombres.append((nombre_norm, indice))
+        return {
+            'categorias': categorias,
+            'exactos': exactos,
+            'contenidos': _Automata(nombres),
+            'sufijos': _TrieSufijos(nombres),
+        }
+
+    def detectar(self, query):
+        """
+        Devuelve (slug, nombre) de la primera categoría que coincide con la
+        búsqueda: igual al nombre o slug, nombre contenido en la búsqueda o
+        búsqueda contenida en el nombre. None si no hay coincidencia.
+        """
+        data = self.get()
+        texto = normalizar_texto(query)
+        indice = min(
+            data['exactos'].get(texto, SIN_COINCIDENCIA),
+            data['contenidos'].buscar(texto),
+            data['sufijos'].buscar(texto),
+        )
+        if indice == SIN_COINCIDENCIA:
+            return None
+        return data['categorias'][indice]
+
+
+category_matcher = CategoryMatcher()
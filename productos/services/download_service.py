@@ -0,0 +1,108 @@
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseRedirect
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date
+
+from muebleria.cache_media import cache_media
+
+
+class DownloadService:
+    """
+    Descarga de archivos de media (resúmenes PDF) sin cargarlos en memoria:
+    se envían por partes desde disco local (cache_media), con respuestas
+    304 para ETag / Last-Modified y soporte de Range (un solo rango), para
+    que el navegador retome descargas o pida solo una parte. Con Azure y
+    DESCARGAS_URL_FIRMADA se redirige a una URL firmada de pocos minutos
+    y el archivo no pasa por el worker.
+    """
+
+    CHUNK = 64 * 1024
+
+    @staticmethod
+    def _rango(request, tamano, etag, ultima_modificacion):
+        """
+        (inicio, fin) incluidos del encabezado Range; None para enviar el
+        archivo completo; False si el rango no se puede satisfacer.
+        """
+        encabezado = request.headers.get('Range', '')
+        if not encabezado.startswith('bytes=') or ',' in encabezado or tamano == 0:
+            return None  # sin rango o rangos múltiples: archivo completo
+        si_rango = request.headers.get('If-Range')
+        if si_rango and si_rango not in (etag, ultima_modificacion):
+            return None  # el archivo cambió desde la descarga parcial
+        desde, _, hasta = encabezado[len('bytes='):].strip().partition('-')
+        try:
+            if desde == '':
+                # Sufijo: los últimos `hasta` bytes
+                cantidad = int(hasta)
+                return (max(0, tamano - cantidad), tamano - 1) if cantidad > 0 else False
+            inicio = int(desde)
+            fin = int(hasta) if hasta else tamano - 1
+        except ValueError:
+            return None
+        if inicio >= tamano or fin < inicio:
+            return False
+        return inicio, min(fin, tamano - 1)
+
+    @staticmethod
+    def _partes(archivo, cantidad):
+        try:
+            while cantidad > 0:
+                parte = archivo.read(min(DownloadService.CHUNK, cantidad))
+                if not parte:
+                    break
+                cantidad -= len(parte)
+                yield parte
+        finally:
+            archivo.close()
+
+    @staticmethod
+    def respuesta(request, archivo, nombre_descarga, content_type, adjunto=True):
+        """respuesta de descarga del FieldFile `archivo`"""
+        disposicion = content_disposition_header(adjunto, nombre_descarga)
+        storage = archivo.storage
+        if settings.DESCARGAS_URL_FIRMADA and hasattr(storage, 'client'):
+            url = storage.url(
+                archivo.name,
+                expire=settings.DESCARGAS_URL_FIRMADA_SEGUNDOS,
+                parameters={'content_disposition': disposicion, 'content_type': content_type},
+            )
+            return HttpResponseRedirect(url)
+
+        try:
+            tamano, modificado, etag = cache_media.metadatos(archivo.name)
+        except FileNotFoundError:
+            raise Http404('Archivo no encontrado')
+        ultima_modificacion = http_date(modificado.timestamp())
+        condicional = get_conditional_response(request, etag=etag, last_modified=int(modificado.timestamp()))
+        if condicional is not None:
+            return condicional
+
+        rango = DownloadService._rango(request, tamano, etag, ultima_modificacion)
+        if rango is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{tamano}'
+            return response
+
+        try:
+            local = cache_media.open(archivo.name)
+        except FileNotFoundError:
+            raise Http404('Archivo no encontrado')
+        if rango is None:
+            response = FileResponse(local, content_type=content_type)
+            response['Content-Length'] = tamano
+        else:
+            inicio, fin = rango
+            local.seek(inicio)
+            response = FileResponse(
+                DownloadService._partes(local, fin - inicio + 1), status=206, content_type=content_type,
+            )
+            response['Content-Range'] = f'bytes {inicio}-{fin}/{tamano}'
+            response['Content-Length'] = fin - inicio + 1
+        response['Content-Disposition'] = disposicion
+        response['Accept-Ranges'] = 'bytes'
+        response['ETag'] = etag
+        response['Last-Modified'] = ultima_modificacion
+        # Datos de un pedido: que no los guarden caches compartidas
+        response['Cache-Control'] = 'private, no-cache'
+        return response
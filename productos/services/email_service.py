@@ -2,7 +2,8 @@ from django.core.mail import EmailMessage
 from django.template.loader import render_to_string
 from django.conf import settings
 from django.utils import timezone
-import os
+
+from muebleria.cache_media import cache_media
 
 class EmailService:
     """
@@ -55,13 +56,17 @@ class EmailService:
             email.content_subtype = "html"
             
             # Adjuntar PDF si existe
-            if resumen_pedido.archivo_pdf and os.path.exists(resumen_pedido.archivo_pdf.path):
-                with open(resumen_pedido.archivo_pdf.path, 'rb') as pdf_file:
-                    email.attach(
-                        f"resumen_pedido_{pedido.numero_pedido}.pdf",
-                        pdf_file.read(),
-                        'application/pdf'
-                    )
+            # (copia local: funciona también con el almacenamiento en Azure)
+            if resumen_pedido.archivo_pdf:
+                try:
+                    with cache_media.open(resumen_pedido.archivo_pdf.name) as pdf_file:
+                        email.attach(
+                            f"resumen_pedido_{pedido.numero_pedido}.pdf",
+                            pdf_file.read(),
+                            'application/pdf'
+                        )
+                except FileNotFoundError:
+                    pass
             
             # Enviar email
             email.send()
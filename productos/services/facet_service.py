@@ -0,0 +1,130 @@
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from productos.models import Producto
+from productos.services.cache_service import CacheService
+from productos.services.search_service import SearchService
+from productos.utils import normalizar_texto
+
+
+class FacetService:
+    """
+    Conteos de filtros (facetas) del listado: por categoría, ofertas y rango
+    de precio. Se calculan en una sola consulta agrupada por categoría y se
+    guardan en cache por búsqueda normalizada y precio mínimo/máximo hasta
+    que cambia el catálogo.
+    """
+
+    # (clave, etiqueta, mínimo incluido, máximo excluido)
+    RANGOS_PRECIO = (
+        ('0-2000', 'Hasta $2,000', None, 2000),
+        ('2000-5000', '$2,000 a $5,000', 2000, 5000),
+        ('5000-10000', '$5,000 a $10,000', 5000, 10000),
+        ('10000-', 'Más de $10,000', 10000, None),
+    )
+    TIMEOUT = 60 * 60
+
+    @staticmethod
+    def indice_rango(clave):
+        for indice, rango in enumerate(FacetService.RANGOS_PRECIO):
+            if rango[0] == clave:
+                return indice
+        return None
+
+    @staticmethod
+    def filtro_rango(clave):
+        """
+        Q del rango de precio (sobre el precio que paga el cliente) o None
+        """
+        indice = FacetService.indice_rango(clave)
+        if indice is None:
+            return None
+        _, _, minimo, maximo = FacetService.RANGOS_PRECIO[indice]
+        filtro = Q()
+        if minimo is not None:
+            filtro &= Q(precio_efectivo__gte=minimo)
+        if maximo is not None:
+            filtro &= Q(precio_efectivo__lt=maximo)
+        return filtro
+
+    @staticmethod
+    def _columna(ofertas, indice_rango):
+        prefijo = 'ofertas' if ofertas else 'todos'
+        return f"{prefijo}_{'todos' if indice_rango is None else indice_rango}"
+
+    @staticmethod
+    def calcular(query=None, precio_min=None, precio_max=None):
+        """
+        Tabla {categoria_id: {columna: conteo}} con los cruces
+        (todos|ofertas) x (todos|rango_i), en UNA consulta agrupada.
+        """
+        productos = Producto.objects.filter(activo=True)
+        # Mismo filtro de precio que el listado (views._filtrar_productos)
+        if precio_min is not None:
+            productos = productos.filter(precio_efectivo__gte=precio_min)
+        if precio_max is not None:
+            productos = productos.filter(precio_efectivo__lte=precio_max)
+        if query:
+            productos = SearchService.filtrar(productos, query)
+        conteos = {}
+        for ofertas in (False, True):
+            base = Q(oferta_activa=True) if ofertas else None
+            conteos[FacetService._columna(ofertas, None)] = Count('id', filter=base)
+            for indice, (clave, _, _, _) in enumerate(FacetService.RANGOS_PRECIO):
+                filtro = FacetService.filtro_rango(clave)
+                if base is not None:
+                    filtro = base & filtro
+                conteos[FacetService._columna(ofertas, indice)] = Count('id', filter=filtro)
+        filas = productos.order_by().values('categoria_id').annotate(**conteos)
+        return {fila.pop('categoria_id'): fila for fila in filas}
+
+    @staticmethod
+    def obtener(query=None, precio_min=None, precio_max=None):
+        """
+        Tabla de conteos desde cache (se invalida con la versión del catálogo)
+        """
+        termino = normalizar_texto(query)
+        version = '.'.join(str(v) for v in CacheService.get_versions('catalogo', 'categorias', 'sinonimos'))
+        seleccion = f'{termino}\0{precio_min}\0{precio_max}'
+        key = f"productos:facetas:{version}:{hashlib.md5(seleccion.encode()).hexdigest()}"
+        tabla = cache.get(key)
+        if tabla is None:
+            tabla = FacetService.calcular(termino, precio_min, precio_max)
+            cache.set(key, tabla, FacetService.TIMEOUT)
+        return tabla
+
+    @staticmethod
+    def resumen(tabla, categoria_id=None, ofertas=False, rango=None, tabla_rangos=None):
+        """
+        Conteos a mostrar para la selección actual: cada faceta se cuenta con
+        los demás filtros aplicados, pero no con el suyo. `tabla` tiene el
+        filtro de precio mínimo/máximo; los rangos de precio, que son la
+        faceta de precio, se cuentan con `tabla_rangos` (la misma si no hay).
+        """
+        if tabla_rangos is None:
+            tabla_rangos = tabla
+        indice_rango = FacetService.indice_rango(rango)
+        por_categoria = {
+            cat_id: fila[FacetService._columna(False, indice_rango)]
+            for cat_id, fila in tabla.items()
+        }
+        if categoria_id:
+            seleccion = [tabla_rangos.get(categoria_id, {})]
+        else:
+            seleccion = list(tabla_rangos.values())
+        rangos = []
+        for indice, (clave, etiqueta, _, _) in enumerate(FacetService.RANGOS_PRECIO):
+            columna = FacetService._columna(ofertas, indice)
+            rangos.append({
+                'clave': clave,
+                'etiqueta': etiqueta,
+                'conteo': sum(fila.get(columna, 0) for fila in seleccion),
+            })
+        return {
+            'categorias': por_categoria,
+            'total': sum(por_categoria.values()),
+            'ofertas': sum(fila[FacetService._columna(True, indice_rango)] for fila in tabla.values()),
+            'rangos': rangos,
+        }
@@ -0,0 +1,185 @@
+from collections import Counter, defaultdict
+from itertools import chain
+
+from productos.models import Categoria, Producto
+from productos.services.cache_service import ProcessIndex
+from productos.utils import normalizar_texto
+
+
+def mascaras(patron):
+    """bits de posición de cada letra del patrón (para distancia_acotada)"""
+    peq = {}
+    for i, caracter in enumerate(patron):
+        peq[caracter] = peq.get(caracter, 0) | (1 << i)
+    return peq
+
+
+def distancia_acotada(patron, texto, maximo, peq=None):
+    """
+    Distancia de Levenshtein entre patron y texto, o maximo + 1 si la supera.
+    Algoritmo bit-paralelo de Myers: una columna de la matriz por letra del
+    texto usando enteros como vectores de bits.
+    """
+    m = len(patron)
+    n = len(texto)
+    if abs(m - n) > maximo:
+        return maximo + 1
+    if m == 0:
+        return n
+    if peq is None:
+        peq = mascaras(patron)
+    mascara = (1 << m) - 1
+    ultimo = 1 << (m - 1)
+    pv = mascara
+    mv = 0
+    puntaje = m
+    for j, caracter in enumerate(texto):
+        eq = peq.get(caracter, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mascara)
+        mh = pv & xh
+        if ph & ultimo:
+            puntaje += 1
+        elif mh & ultimo:
+            puntaje -= 1
+        # Lo que falta del texto puede bajar la distancia a lo sumo 1 por letra
+        if puntaje - (n - j - 1) > maximo:
+            return maximo + 1
+        ph = ((ph << 1) | 1) & mascara
+        mh = (mh << 1) & mascara
+        pv = (mh | ~(xv | ph)) & mascara
+        mv = ph & xv
+    return puntaje if puntaje <= maximo else maximo + 1
+
+
+class FuzzyIndex(ProcessIndex):
+    """
+    Corrector de búsquedas con errores de tipeo ("sion", "lampra de pie",
+    "mesa comedr") sobre el vocabulario del catálogo: nombres de productos
+    activos y de categorías, ya normalizados. Los candidatos de cada palabra
+    salen de un índice invertido de bigramas y se confirman con la
+    distancia de edición (1 error hasta 3 letras, 2 errores desde 4).
+    """
+
+    # Solo nombres, categoría y activo (no precio, stock ni ventas)
+    versiones = ('nombres', 'categorias')
+
+    def build(self):
+        nombres = list(Producto.objects.filter(activo=True).values_list('nombre_normalizado', flat=True))
+        nombres += [normalizar_texto(nombre) for nombre in Categoria.objects.values_list('nombre', flat=True)]
+        return self.construir(nombres)
+
+    @staticmethod
+    def bigramas(palabra):
+        texto = f'${palabra}$'
+        return {texto[i:i + 2] for i in range(len(texto) - 1)}
+
+    @staticmethod
+    def max_errores(palabra):
+        return 1 if len(palabra) <= 3 else 2
+
+    @classmethod
+    def construir(cls, nombres):
+        """
+        Vocabulario con frecuencias e índice (bigrama, largo) -> ids de
+        palabra, a partir de textos normalizados. Separar por largo evita
+        recorrer palabras que no pueden estar a pocas ediciones.
+        """
+        frecuencias = defaultdict(int)
+        for nombre in nombres:
+            for palabra in set((nombre or '').split()):
+                frecuencias[palabra] += 1
+        palabras = sorted(frecuencias)
+        indice = defaultdict(list)
+        for palabra_id, palabra in enumerate(palabras):
+            for bigrama in cls.bigramas(palabra):
+                indice[(bigrama, len(palabra))].append(palabra_id)
+        return {
+            'palabras': palabras,
+            'frecuencias': [frecuencias[palabra] for palabra in palabras],
+            'cantidad_bigramas': [len(cls.bigramas(palabra)) for palabra in palabras],
+            'vocabulario': frozenset(palabras),
+            'bigramas': {clave: tuple(ids) for clave, ids in indice.items()},
+        }
+
+    @staticmethod
+    def _minimo_compartido(propios, distancia):
+        """
+        Cada edición cambia a lo sumo 2 bigramas, así que una palabra a
+        `distancia` ediciones comparte al menos len(propios) - 2 * distancia.
+        Si ese mínimo no es positivo se pide al menos uno (se pierden solo
+        casos sin ninguna letra vecina en común, que tampoco serían una
+        buena corrección).
+        """
+        return max(1, len(propios) - 2 * distancia)
+
+    def _mas_cercana(self, data, palabra, propios, peq, errores):
+        """
+        Mejor palabra del vocabulario a `errores` ediciones o menos (a igual
+        distancia, la más frecuente). Solo se mide la distancia de las que
+        comparten suficientes bigramas.
+        """
+        palabras = data['palabras']
+        frecuencias = data['frecuencias']
+        cantidad_bigramas = data['cantidad_bigramas']
+        indice = data['bigramas']
+        compartidos = Counter(chain.from_iterable(
+            indice.get((bigrama, largo), ())
+            for largo in range(len(palabra) - errores, len(palabra) + errores + 1)
+            for bigrama in propios
+        ))
+        minimo = self._minimo_compartido(propios, errores)
+        mejor = None
+        mejor_clave = None
+        for palabra_id, cantidad in compartidos.items():
+            # El mínimo vale contando desde los bigramas de cualquiera de las dos
+            if cantidad < minimo or cantidad < cantidad_bigramas[palabra_id] - 2 * errores:
+                continue
+            distancia = distancia_acotada(palabra, palabras[palabra_id], errores, peq)
+            if distancia > errores:
+                continue
+            clave = (distancia, -frecuencias[palabra_id], palabras[palabra_id])
+            if mejor_clave is None or clave < mejor_clave:
+                mejor, mejor_clave = palabras[palabra_id], clave
+        return mejor
+
+    def corregir_palabra(self, palabra, data=None):
+        """
+        La palabra del vocabulario más cercana o None si ninguna está dentro
+        del límite de errores. Primero se buscan las que están a 1 error
+        (filtro más estricto y menos largos posibles) y solo si no hay
+        ninguna se amplía a 2.
+        """
+        data = data or self.get()
+        propios = self.bigramas(palabra)
+        peq = mascaras(palabra)
+        for errores in range(1, self.max_errores(palabra) + 1):
+            mejor = self._mas_cercana(data, palabra, propios, peq, errores)
+            if mejor:
+                return mejor
+        return None
+
+    def corregir(self, query, data=None):
+        """
+        Búsqueda corregida palabra por palabra, o None si no hay nada que
+        corregir o ninguna palabra se parece al vocabulario
+        """
+        data = data or self.get()
+        vocabulario = data['vocabulario']
+        corregidas = []
+        cambio = False
+        for palabra in normalizar_texto(query).split():
+            if palabra in vocabulario:
+                corregidas.append(palabra)
+                continue
+            correccion = self.corregir_palabra(palabra, data)
+            if correccion:
+                corregidas.append(correccion)
+                cambio = True
+        if not cambio:
+            return None
+        return ' '.join(corregidas)
+
+
+fuzzy_index = FuzzyIndex()
@@ -0,0 +1,103 @@
+from django.core.cache import cache
+from django.utils import timezone
+
+from blog.models import Blog
+from productos.models import BannerPromocional, Producto
+from productos.services.cache_service import CacheService
+from productos.services.catalog_service import catalogo_snapshot
+from productos.services.image_service import ImageService
+from productos.services.leaderboard_service import LeaderboardService
+
+
+class HomeService:
+    """
+    Datos de la página de inicio armados por secciones y guardados en
+    cache, cada una con su propia duración. Una visita cuesta una lectura
+    múltiple de la cache; si falta una sección la calcula un solo worker
+    (CacheService.calcular_una_vez). Las claves llevan la versión del
+    catálogo, así un cambio de productos se ve en la siguiente visita.
+    """
+
+    # Segundos en cache de cada sección
+    SECCIONES = {
+        'carrusel': 60,
+        'grid': 60 * 5,
+        'top': 60 * 5,
+        'banner': 60 * 2,
+        'blogs': 60 * 10,
+    }
+    PRODUCTOS_CARRUSEL = 3
+    PRODUCTOS_GRID = 8
+    PRODUCTOS_TOP = 6
+
+    @staticmethod
+    def _carrusel():
+        ids = catalogo_snapshot.muestra(HomeService.PRODUCTOS_CARRUSEL)
+        return {'productos_carrusel': Producto.objects.en_orden(ids)}
+
+    @staticmethod
+    def _grid():
+        # Se guardan de más para poder quitar los del carrusel al armar la página
+        limite = HomeService.PRODUCTOS_GRID + HomeService.PRODUCTOS_CARRUSEL
+        return {'grid_candidatos': Producto.objects.en_orden(LeaderboardService.top(limite))}
+
+    @staticmethod
+    def _top():
+        ids = LeaderboardService.top(HomeService.PRODUCTOS_TOP)
+        top_productos = Producto.objects.para_grid().en_orden(ids)
+        if all(p.ventas == 0 for p in top_productos):
+            # Si todos tienen 0 ventas, mostrar productos al azar
+            ids = catalogo_snapshot.muestra(HomeService.PRODUCTOS_TOP)
+            top_productos = Producto.objects.para_grid().en_orden(ids)
+        return {'top_productos': top_productos}
+
+    @staticmethod
+    def _banner():
+        ahora = timezone.now()
+        banner = BannerPromocional.objects.select_related('producto_destacado').filter(
+            activo=True,
+            fecha_inicio__lte=ahora,
+            fecha_fin__gte=ahora,
+        ).order_by('-fecha_inicio').first()
+        return {
+            'banner': banner,
+            'banner_productos_carrusel': list(banner.productos_carrusel.all()) if banner else [],
+        }
+
+    @staticmethod
+    def _blogs():
+        return {'blogs_recientes': list(Blog.objects.order_by('-fecha_creacion')[:2])}
+
+    @staticmethod
+    def obtener():
+        """
+        Contexto de la página de inicio (sin el formulario de suscripción)
+        """
+        version = CacheService.get_versions('catalogo')[0]
+        claves = {nombre: f'productos:inicio:{version}:{nombre}' for nombre in HomeService.SECCIONES}
+        guardadas = cache.get_many(claves.values())
+        datos = {}
+        for nombre, key in claves.items():
+            seccion = guardadas.get(key)
+            if seccion is None:
+                seccion = CacheService.calcular_una_vez(
+                    key, getattr(HomeService, f'_{nombre}'), HomeService.SECCIONES[nombre],
+                )
+            datos.update(seccion)
+        carrusel_ids = {p.id for p in datos['productos_carrusel']}
+        datos['productos_grid'] = [
+            p for p in datos.pop('grid_candidatos') if p.id not in carrusel_ids
+        ][:HomeService.PRODUCTOS_GRID]
+        # Versiones reducidas de las imágenes de la página: una lectura a la
+        # cache por request (no se guardan en las secciones, ver ImageService)
+        banner = datos['banner']
+        imagenes = [p.imagen_principal for p in datos['productos_carrusel']]
+        imagenes += [p.imagen_principal for p in datos['productos_grid']]
+        imagenes += [p.imagen_principal for p in datos['banner_productos_carrusel']]
+        imagenes += [blog.imagen for blog in datos['blogs_recientes']]
+        if banner is not None:
+            imagenes.append(banner.imagen_lateral)
+            if banner.producto_destacado:
+                imagenes.append(banner.producto_destacado.imagen_principal)
+        datos['variantes'] = ImageService.variantes_many(imagen.name for imagen in imagenes)
+        return datos
@@ -0,0 +1,206 @@
+import hashlib
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from PIL import Image, ImageOps, features
+
+from muebleria.cache_media import CacheMedia, cache_media
+from muebleria.trabajos import Tarea
+from productos.models import ImagenDerivada, ImagenProducto, Producto
+
+
+def renderizar_derivadas(contenido, anchos, formatos, calidad):
+    """
+    Decodifica la imagen (bytes) y la codifica reducida a cada ancho menor
+    que el original (o al original si es más chico). Solo CPU: corre en el
+    pool de procesos del worker. Devuelve [(ancho, alto, formato, bytes)].
+    """
+    original = ImageOps.exif_transpose(Image.open(BytesIO(contenido)))
+    original.load()
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA' if 'transparency' in original.info else 'RGB')
+    anchos = [ancho for ancho in anchos if ancho < original.width] or [original.width]
+    resultado = []
+    for ancho in anchos:
+        alto = max(1, round(original.height * ancho / original.width))
+        reducida = original.resize((ancho, alto), Image.LANCZOS)
+        for formato in formatos:
+            buffer = BytesIO()
+            reducida.save(buffer, format=formato.upper(), quality=calidad)
+            resultado.append((ancho, alto, formato, buffer.getvalue()))
+    return resultado
+
+
+class ImageService:
+    """
+    Versiones reducidas (WebP y, si está activado, AVIF) de las imágenes
+    subidas, a unos pocos anchos. Se generan en segundo plano después de
+    guardar la imagen original (tarea_derivadas) y se guardan en
+    ImagenDerivada con su URL y dimensiones; las plantillas las piden con
+    los filtros srcset y miniatura (productos_tags).
+    """
+
+    ANCHOS = (320, 640, 1024, 1600)
+    CALIDAD = 80
+    TIMEOUT = 60 * 60 * 24
+
+    @staticmethod
+    def formatos():
+        formatos = ['webp']
+        if getattr(settings, 'IMAGENES_AVIF', False) and features.check('avif'):
+            formatos.append('avif')
+        return formatos
+
+    @staticmethod
+    def _cache_key(nombre):
+        return f'imagenes:derivadas:{hashlib.md5(nombre.encode()).hexdigest()}'
+
+    @staticmethod
+    def _ruta(nombre, ancho, formato):
+        base, _ = os.path.splitext(nombre)
+        return f'derivadas/{base}-{ancho}.{formato}'
+
+    @staticmethod
+    def preparar(nombre, storage=None):
+        """argumentos de renderizar_derivadas para la imagen guardada en `nombre`"""
+        # Copia en disco local: reprocesar una imagen no la vuelve a descargar
+        origen = cache_media if storage is None else CacheMedia(storage)
+        with origen.open(nombre) as archivo:
+            contenido = archivo.read()
+        return contenido, ImageService.ANCHOS, ImageService.formatos(), ImageService.CALIDAD
+
+    @staticmethod
+    def guardar(nombre, renderizadas, storage=None):
+        """reemplaza las derivadas de `nombre` por las renderizadas"""
+        storage = storage or default_storage
+        ImageService.borrar(nombre, storage)
+        derivadas = []
+        for ancho, alto, formato, contenido in renderizadas:
+            ruta = storage.save(ImageService._ruta(nombre, ancho, formato), ContentFile(contenido))
+            derivadas.append(ImagenDerivada(
+                original=nombre, formato=formato, ancho=ancho, alto=alto, archivo=ruta,
+            ))
+        ImagenDerivada.objects.bulk_create(derivadas)
+        cache.delete(ImageService._cache_key(nombre))
+        return len(derivadas)
+
+    @staticmethod
+    def generar(nombre, storage=None):
+        """
+        Genera (o regenera) en este proceso las derivadas de la imagen
+        guardada en `nombre`. Devuelve cuántas se crearon.
+        """
+        renderizadas = renderizar_derivadas(*ImageService.preparar(nombre, storage))
+        return ImageService.guardar(nombre, renderizadas, storage)
+
+    @staticmethod
+    def borrar(nombre, storage=None):
+        """borra los archivos y registros de las derivadas de `nombre`"""
+        storage = storage or default_storage
+        existentes = ImagenDerivada.objects.filter(original=nombre)
+        for ruta in existentes.values_list('archivo', flat=True):
+            storage.delete(ruta)
+        existentes.delete()
+        cache.delete(ImageService._cache_key(nombre))
+
+    @staticmethod
+    def asegurar(imagen):
+        """
+        Encola la generación de derivadas de un campo de imagen recién
+        guardado si todavía no las tiene (la hace el comando procesar_trabajos)
+        """
+        nombre = getattr(imagen, 'name', None)
+        if not nombre or ImagenDerivada.objects.filter(original=nombre).exists():
+            return
+        tarea_derivadas.encolar(nombre=nombre)
+
+    @staticmethod
+    def variantes_many(nombres):
+        """
+        {nombre: [(formato, ancho, alto, url), ...]} ordenadas por ancho, con
+        una lectura múltiple a la cache y una consulta para las que falten
+        """
+        nombres = {nombre for nombre in nombres if nombre}
+        if not nombres:
+            return {}  # Redis no acepta MGET sin claves
+        keys = {ImageService._cache_key(nombre): nombre for nombre in nombres}
+        cacheadas = cache.get_many(keys)
+        resultado = {keys[key]: valor for key, valor in cacheadas.items()}
+        faltantes = nombres - resultado.keys()
+        if faltantes:
+            nuevas = {nombre: [] for nombre in faltantes}
+            filas = ImagenDerivada.objects.filter(original__in=faltantes).order_by('ancho')
+            for derivada in filas:
+                nuevas[derivada.original].append(
+                    (derivada.formato, derivada.ancho, derivada.alto, derivada.archivo.url)
+                )
+            cache.set_many(
+                {ImageService._cache_key(nombre): valor for nombre, valor in nuevas.items()},
+                ImageService.TIMEOUT,
+            )
+            resultado.update(nuevas)
+        return resultado
+
+    @staticmethod
+    def variantes(nombre):
+        return ImageService.variantes_many([nombre]).get(nombre, [])
+
+    @staticmethod
+    def variantes_productos(productos):
+        """variantes_many de las imágenes principales de `productos`"""
+        return ImageService.variantes_many(producto.imagen_principal.name for producto in productos)
+
+    @staticmethod
+    def srcset(imagen, formato='webp', variantes=None):
+        """valor del atributo srcset ("url 320w, url 640w") o '' si no hay derivadas"""
+        if not imagen:
+            return ''
+        if variantes is None:
+            variantes = ImageService.variantes(imagen.name)
+        return ', '.join(f'{url} {ancho}w' for tipo, ancho, _, url in variantes if tipo == formato)
+
+    @staticmethod
+    def miniatura(imagen, ancho, variantes=None):
+        """
+        URL de la derivada WebP más chica que cubre `ancho` (o la más grande
+        si ninguna alcanza); la original si no tiene derivadas
+        """
+        if not imagen:
+            return ''
+        if variantes is None:
+            variantes = ImageService.variantes(imagen.name)
+        webp = [(w, url) for tipo, w, _, url in variantes if tipo == 'webp']
+        if not webp:
+            return imagen.url
+        return next((url for w, url in webp if w >= ancho), webp[-1][1])
+
+
+def _preparar_derivadas(datos):
+    nombre = datos['nombre']
+    pendiente = getattr(default_storage, 'ruta_pendiente', None)
+    if not default_storage.exists(nombre) and not (pendiente and pendiente(nombre)):
+        return None  # la imagen se borró antes de procesarla
+    return ImageService.preparar(datos['nombre'])
+
+
+def _terminar_derivadas(datos, renderizadas):
+    nombre = datos['nombre']
+    ImageService.guardar(nombre, renderizadas)
+    # Las tarjetas cacheadas de los productos con esta imagen usan las nuevas
+    # URLs. La portada no hace falta: guarda productos y las URLs salen de
+    # ImageService.variantes al renderizar (su cache la limpia guardar)
+    producto_ids = set(ImagenProducto.objects.filter(imagen=nombre).values_list('producto_id', flat=True))
+    Producto.objects.filter(Q(imagen_principal=nombre) | Q(pk__in=producto_ids)).tocar()
+
+
+tarea_derivadas = Tarea(
+    'productos.services.image_service.tarea_derivadas',
+    _preparar_derivadas,
+    renderizar_derivadas,
+    _terminar_derivadas,
+)
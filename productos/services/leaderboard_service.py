@@ -0,0 +1,103 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from productos.models import Producto
+from productos.services.cache_service import CacheService
+
+
+class LeaderboardService:
+    """
+    Ranking de productos más vendidos (general y por categoría) guardado en
+    cache como listas cortas ya ordenadas de (ventas, fecha_creacion, id).
+    Leer el top N no toca Producto. Cada venta actualiza solo las listas
+    del producto vendido: como las ventas solo suben, un producto fuera
+    del top entra únicamente con una venta propia. Editar o borrar
+    productos cambia la versión 'ranking' y las listas se rearman.
+    """
+
+    TOP = 50
+    TIMEOUT = 60 * 60 * 24
+
+    @staticmethod
+    def _clave():
+        version = '.'.join(str(v) for v in CacheService.get_versions('ranking', 'categorias'))
+        return f'productos:ranking:{version}'
+
+    @staticmethod
+    def construir():
+        """listas desde la base de datos: general y por categoría"""
+        activos = Producto.objects.filter(activo=True)
+        tabla = {'todos': list(
+            activos.order_by('-ventas', '-fecha_creacion', '-id').values_list('ventas', 'fecha_creacion', 'id')[:LeaderboardService.TOP]
+        )}
+        por_categoria = activos.annotate(puesto=Window(
+            RowNumber(),
+            partition_by=F('categoria'),
+            order_by=[F('ventas').desc(), F('fecha_creacion').desc(), F('id').desc()],
+        )).filter(puesto__lte=LeaderboardService.TOP, categoria__isnull=False).values_list(
+            'categoria_id', 'ventas', 'fecha_creacion', 'id',
+        )
+        for categoria_id, ventas, fecha, producto_id in por_categoria:
+            tabla.setdefault(categoria_id, []).append((ventas, fecha, producto_id))
+        for lista in tabla.values():
+            lista.sort(reverse=True)
+        return tabla
+
+    @staticmethod
+    def _tabla():
+        clave = LeaderboardService._clave()
+        tabla = cache.get(clave)
+        if tabla is None:
+            tabla = CacheService.calcular_una_vez(clave, LeaderboardService.construir, LeaderboardService.TIMEOUT)
+        return tabla
+
+    @staticmethod
+    def top(n, categoria_id=None):
+        """ids de los n productos más vendidos (n <= TOP), en orden"""
+        lista = LeaderboardService._tabla().get(categoria_id or 'todos', [])
+        return [producto_id for _, _, producto_id in lista[:n]]
+
+    @staticmethod
+    def _actualizar(lista, fila):
+        """pone la fila nueva del producto en su lugar dentro de la lista"""
+        producto_id = fila[2]
+        lista = [actual for actual in lista if actual[2] != producto_id]
+        if len(lista) < LeaderboardService.TOP or fila > lista[-1]:
+            lista.append(fila)
+            lista.sort(reverse=True)
+        return lista[:LeaderboardService.TOP]
+
+    @staticmethod
+    def _aplicar(producto_ids):
+        clave = LeaderboardService._clave()
+        candado = f'{clave}:editando'
+        if not cache.add(candado, 1, timeout=10):
+            # Otro worker está editando: rearmar desde la base de datos
+            CacheService.bump_version('ranking')
+            return
+        try:
+            tabla = cache.get(clave)
+            if tabla is None:
+                return  # se arma completa en la próxima lectura
+            filas = Producto.objects.filter(pk__in=producto_ids, activo=True).values_list(
+                'ventas', 'fecha_creacion', 'id', 'categoria_id',
+            )
+            for ventas, fecha, producto_id, categoria_id in filas:
+                fila = (ventas, fecha, producto_id)
+                tabla['todos'] = LeaderboardService._actualizar(tabla['todos'], fila)
+                if categoria_id:
+                    tabla[categoria_id] = LeaderboardService._actualizar(tabla.get(categoria_id, []), fila)
+            cache.set(clave, tabla, LeaderboardService.TIMEOUT)
+        finally:
+            cache.delete(candado)
+
+    @staticmethod
+    def registrar_ventas(producto_ids):
+        """
+        Actualiza el ranking con las ventas nuevas de esos productos, una vez
+        confirmada la transacción (se leen sus ventas ya guardadas)
+        """
+        producto_ids = list(producto_ids)
+        transaction.on_commit(lambda: LeaderboardService._aplicar(producto_ids))
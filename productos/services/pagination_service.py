@@ -0,0 +1,103 @@
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """
+    Como DjangoJSONEncoder pero sin recortar los microsegundos: el cursor
+    debe conservar el valor exacto que se compara en la base de datos.
+    """
+
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPaginator:
+    """
+    Paginación por cursor (keyset) sobre un orden estable. El cursor guarda
+    los valores de orden del último elemento de la página, así cada página
+    cuesta lo mismo sin importar qué tan profunda sea (no usa OFFSET).
+    El último campo del orden debe ser único (p.ej. 'id').
+    """
+
+    def __init__(self, queryset, ordering, page_size):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.page_size = page_size
+        self.campos = [(campo.lstrip('-'), campo.startswith('-')) for campo in self.ordering]
+
+    def encode_cursor(self, obj):
+        return self.encode_valores([getattr(obj, nombre) for nombre, _ in self.campos])
+
+    def encode_valores(self, valores):
+        """cursor a partir de los valores de orden (en el orden de self.campos)"""
+        data = json.dumps(list(valores), cls=CursorEncoder, separators=(',', ':'))
+        return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """
+        Devuelve los valores del cursor o None si el cursor no es válido
+        """
+        try:
+            data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            valores = json.loads(data)
+        except (binascii.Error, ValueError, TypeError):
+            return None
+        if not isinstance(valores, list) or len(valores) != len(self.campos):
+            return None
+        model = self.queryset.model
+        anotaciones = self.queryset.query.annotations
+        convertidos = []
+        for (nombre, _), valor in zip(self.campos, valores):
+            try:
+                if nombre in anotaciones:
+                    # p.ej. rank (numeric): mismo tipo que devuelve la base de datos
+                    campo = anotaciones[nombre].output_field
+                else:
+                    campo = model._meta.get_field(nombre)
+                valor = campo.to_python(valor)
+            except FieldDoesNotExist:
+                pass
+            except ValidationError:
+                return None
+            convertidos.append(valor)
+        return convertidos
+
+    def _filtro(self, valores):
+        """
+        (a, b, c) "después de" (va, vb, vc) según el orden, expandido a
+        a < va OR (a = va AND b < vb) OR ... más una cota sobre el primer
+        campo para que Postgres pueda arrancar el recorrido del índice ahí.
+        """
+        primero, desc = self.campos[0]
+        filtro = Q(**{f"{primero}__{'lte' if desc else 'gte'}": valores[0]})
+        siguientes = Q()
+        iguales = {}
+        for (nombre, desc), valor in zip(self.campos, valores):
+            siguientes |= Q(**iguales, **{f"{nombre}__{'lt' if desc else 'gt'}": valor})
+            iguales[nombre] = valor
+        return filtro & siguientes
+
+    def page(self, cursor=None):
+        """
+        Devuelve (elementos de la página, cursor de la siguiente o None)
+        """
+        queryset = self.queryset.order_by(*self.ordering)
+        if cursor:
+            valores = self.decode_cursor(cursor)
+            if valores is not None:
+                queryset = queryset.filter(self._filtro(valores))
+        elementos = list(queryset[:self.page_size + 1])
+        siguiente = None
+        if len(elementos) > self.page_size:
+            elementos = elementos[:self.page_size]
+            siguiente = self.encode_cursor(elementos[-1])
+        return elementos, siguiente
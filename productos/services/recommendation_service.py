@@ -0,0 +1,39 @@
+from productos.models import Producto, RecomendacionProducto
+
+
+class RecommendationService:
+    """
+    Productos comprados juntos (campo 'relacionados') y guardados juntos en
+    favoritos ('guardados_juntos'). Las listas se calculan fuera de línea
+    con el comando recalcular_recomendaciones; aquí solo se leen (una
+    consulta por la llave primaria) y se traen los productos activos.
+    """
+
+    CAMPOS = ('relacionados', 'guardados_juntos')
+
+    @staticmethod
+    def para_productos(producto_ids, limite=4, campo='relacionados'):
+        """
+        Productos afines a los dados (sin incluirlos), mezclando las listas
+        por puesto: primero el más afín de cada una, luego el segundo...
+        """
+        if campo not in RecommendationService.CAMPOS:
+            raise ValueError(f'Campo de recomendaciones desconocido: {campo}')
+        producto_ids = list(producto_ids)
+        if not producto_ids:
+            return []
+        listas = dict(
+            RecomendacionProducto.objects.filter(producto_id__in=producto_ids).values_list('producto_id', campo)
+        )
+        # Respeta el orden recibido (p.ej. el del carrito)
+        listas = [listas[producto_id] for producto_id in producto_ids if producto_id in listas]
+        excluidos = set(producto_ids)
+        ids = []
+        for puesto in range(max((len(lista) for lista in listas), default=0)):
+            for lista in listas:
+                if puesto < len(lista) and lista[puesto] not in excluidos:
+                    excluidos.add(lista[puesto])
+                    ids.append(lista[puesto])
+        # Se piden de más por si alguno ya no está activo
+        productos = Producto.objects.filter(activo=True).en_orden(ids[:limite * 2])
+        return productos[:limite]
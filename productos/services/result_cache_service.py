@@ -0,0 +1,75 @@
+import hashlib
+import json
+
+from django.core.cache import cache
+
+from productos.models import Producto
+from productos.services.cache_service import CacheService
+from productos.services.pagination_service import CursorEncoder, KeysetPaginator
+from productos.utils import normalizar_texto
+
+
+class ResultCacheService:
+    """
+    Cache de resultados del listado: por cada búsqueda normalizada y
+    combinación de filtros guarda la lista ordenada de productos (valores
+    de orden e id). Una búsqueda repetida solo cuesta traer esos ids.
+    Se invalida con las versiones del catálogo, de categorías y de
+    sinónimos, que suben al guardar o borrar Producto, Categoria o
+    Sinonimo. Las ventas no la invalidan (cambian con cada compra): el
+    desempate por ventas puede quedar hasta TIMEOUT atrasado.
+    """
+
+    TIMEOUT = 60 * 5
+    # Filas guardadas por búsqueda; más allá se pagina contra la base de datos
+    MAX_RESULTADOS = 480
+
+    @staticmethod
+    def clave(query, categoria_slug, parametros):
+        partes = [
+            ' '.join(normalizar_texto(query).split()),
+            categoria_slug or '',
+            sorted((nombre, valor) for nombre, valor in parametros.items() if valor is not None),
+        ]
+        resumen = hashlib.md5(json.dumps(partes, cls=CursorEncoder).encode()).hexdigest()
+        version = '.'.join(str(v) for v in CacheService.get_versions('catalogo', 'categorias', 'sinonimos'))
+        return f'productos:resultados:{version}:{resumen}'
+
+    @staticmethod
+    def _hidratar(filas):
+        return Producto.objects.para_grid().en_orden([fila[-1] for fila in filas])
+
+    @staticmethod
+    def pagina(queryset, ordering, page_size, cursor, clave):
+        """
+        Igual que KeysetPaginator.page pero sirviendo la página desde la
+        lista cacheada cuando es posible. El orden debe terminar en 'id'.
+        """
+        paginator = KeysetPaginator(queryset, ordering, page_size)
+        campos = [nombre for nombre, _ in paginator.campos]
+        filas = cache.get(clave)
+        if filas is None:
+            CacheService.contar('resultados:fallos')
+            filas = list(queryset.order_by(*ordering).values_list(*campos)[:ResultCacheService.MAX_RESULTADOS + 1])
+            cache.set(clave, filas, ResultCacheService.TIMEOUT)
+        else:
+            CacheService.contar('resultados:aciertos')
+        completo = len(filas) <= ResultCacheService.MAX_RESULTADOS
+        filas = filas[:ResultCacheService.MAX_RESULTADOS]
+
+        inicio = 0
+        if cursor:
+            valores = paginator.decode_cursor(cursor)
+            if valores is not None:
+                inicio = next((i + 1 for i, fila in enumerate(filas) if fila[-1] == valores[-1]), None)
+                if inicio is None:
+                    # Cursor de otra versión del catálogo o más allá de lo guardado
+                    return paginator.page(cursor)
+
+        seleccion = filas[inicio:inicio + page_size]
+        fin = inicio + len(seleccion)
+        if fin >= len(filas) and not completo:
+            # La página llega al final de lo guardado: seguir contra la base
+            return paginator.page(cursor)
+        siguiente = paginator.encode_valores(seleccion[-1]) if fin < len(filas) else None
+        return ResultCacheService._hidratar(seleccion), siguiente
@@ -0,0 +1,97 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+from django.db.models import DecimalField, F, Q, TextField, Value
+from django.db.models.functions import Cast
+
+from productos.models import Producto
+from productos.services.synonym_service import sinonimos_index
+from productos.utils import normalizar_texto
+
+
+class SearchService:
+    """
+    Servicio de búsqueda de productos sobre PostgreSQL (full-text + trigramas)
+    """
+
+    # Diccionario de Postgres usado para el stemming en español. El texto se
+    # indexa ya normalizado (sin acentos) con normalizar_texto.
+    CONFIG = 'spanish'
+
+    @staticmethod
+    def construir_vector(nombre, categoria, descripcion):
+        """
+        Expresión tsvector ponderada: nombre (A), categoría (B), descripción (C)
+        """
+        config = SearchService.CONFIG
+        return (
+            SearchVector(Value(normalizar_texto(nombre), output_field=TextField()), weight='A', config=config)
+            + SearchVector(Value(normalizar_texto(categoria), output_field=TextField()), weight='B', config=config)
+            + SearchVector(Value(normalizar_texto(descripcion), output_field=TextField()), weight='C', config=config)
+        )
+
+    # Productos por UPDATE al recalcular vectores
+    LOTE = 500
+
+    @staticmethod
+    def actualizar_vectores(productos=None):
+        """
+        Recalcula el vector de búsqueda de los productos dados (o de todos),
+        de a LOTE productos por UPDATE. El texto se normaliza en Python
+        (normalizar_texto), por eso no es un único UPDATE en SQL.
+        """
+        if productos is None:
+            productos = Producto.objects.all()
+        filas = productos.values_list('id', 'nombre', 'descripcion', 'categoria__nombre')
+        lote = []
+        for producto_id, nombre, descripcion, categoria in filas.iterator(chunk_size=SearchService.LOTE):
+            producto = Producto(pk=producto_id)
+            producto.vector_busqueda = SearchService.construir_vector(nombre, categoria, descripcion)
+            lote.append(producto)
+            if len(lote) >= SearchService.LOTE:
+                Producto.objects.bulk_update(lote, ['vector_busqueda'])
+                lote = []
+        if lote:
+            Producto.objects.bulk_update(lote, ['vector_busqueda'])
+
+    @staticmethod
+    def consulta(termino):
+        """
+        SearchQuery de la búsqueda. Si alguna palabra tiene sinónimos se
+        usa la tsquery expandida (sigue siendo una sola condición sobre el
+        índice GIN); si no, la sintaxis web (comillas, OR, -palabra).
+        """
+        expandida = sinonimos_index.expandir(termino)
+        if expandida:
+            return SearchQuery(expandida, config=SearchService.CONFIG, search_type='raw')
+        return SearchQuery(termino, config=SearchService.CONFIG, search_type='websearch')
+
+    @staticmethod
+    def filtrar(productos, query, consulta=None):
+        """
+        Filtra los productos que coinciden con la búsqueda (sin ordenar).
+        Usa el índice GIN del vector y el índice de trigramas del nombre normalizado.
+        """
+        termino = normalizar_texto(query)
+        if not termino:
+            return productos
+        consulta = consulta or SearchService.consulta(termino)
+        return productos.filter(
+            Q(vector_busqueda=consulta) |
+            Q(nombre_normalizado__contains=termino) |
+            Q(nombre_normalizado__trigram_word_similar=termino)
+        )
+
+    @staticmethod
+    def buscar(productos, query):
+        """
+        Filtra y ordena por relevancia los productos que coinciden con la búsqueda
+        """
+        termino = normalizar_texto(query)
+        if not termino:
+            return productos
+        consulta = SearchService.consulta(termino)
+        # numeric y no real: el valor vuelve exacto en el cursor de paginación,
+        # así los empates de rank se desempatan por ventas/fecha/id
+        rank = SearchRank(F('vector_busqueda'), consulta) + TrigramWordSimilarity(termino, 'nombre_normalizado')
+        return SearchService.filtrar(productos, termino, consulta).annotate(
+            rank=Cast(rank, DecimalField(max_digits=12, decimal_places=6)),
+        ).order_by('-rank', '-ventas', '-fecha_creacion', '-id')
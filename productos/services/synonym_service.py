@@ -0,0 +1,95 @@
+import re
+
+from productos.models import Sinonimo
+from productos.services.cache_service import ProcessIndex
+from productos.utils import normalizar_texto
+
+PALABRA = re.compile(r'[a-z0-9]+')
+DIMINUTIVOS = ('cito', 'cita', 'ito', 'ita')
+
+
+def palabras(texto):
+    """palabras de un texto normalizado (solo letras y números)"""
+    return PALABRA.findall(normalizar_texto(texto))
+
+
+def raiz(palabra):
+    """
+    Stemmer ligero para español sobre palabras normalizadas: quita plural,
+    diminutivo y vocal final ("sillones" y "sillon", "mesitas" y "mesa",
+    "tapetes" y "tapete" dan la misma raíz). Solo se usa para encontrar la
+    palabra en el mapa de sinónimos; Postgres hace su propio stemming.
+    """
+    if len(palabra) > 4 and palabra.endswith('ces'):
+        palabra = palabra[:-3] + 'z'
+    elif len(palabra) > 4 and palabra.endswith('es') and palabra[-3] not in 'aeiou':
+        palabra = palabra[:-2]
+    elif len(palabra) > 3 and palabra.endswith('s'):
+        palabra = palabra[:-1]
+    for sufijo in DIMINUTIVOS:
+        if palabra.endswith(sufijo) and len(palabra) - len(sufijo) >= 3:
+            palabra = palabra[:-len(sufijo)]
+            break
+    if len(palabra) > 3 and palabra[-1] in 'aeo':
+        palabra = palabra[:-1]
+    return palabra
+
+
+class SynonymIndex(ProcessIndex):
+    """
+    Mapa en memoria (raíces de una frase) -> frases equivalentes, armado
+    desde la tabla Sinonimo. expandir() convierte la búsqueda en una sola
+    tsquery con alternativas: "sofa rojo" -> (sofa | sillon) & rojo.
+    """
+
+    versiones = ('sinonimos',)
+
+    def build(self):
+        mapa = {}
+        for sinonimo in Sinonimo.objects.filter(activo=True):
+            frases = {tuple(palabras(termino)) for termino in sinonimo.lista_terminos()}
+            frases.discard(())
+            for frase in frases:
+                clave = tuple(raiz(palabra) for palabra in frase)
+                mapa.setdefault(clave, set()).update(frases)
+        return {
+            'mapa': {clave: sorted(frases) for clave, frases in mapa.items()},
+            'largo_maximo': max((len(clave) for clave in mapa), default=0),
+        }
+
+    @staticmethod
+    def _tsquery_frase(frase):
+        return ' <-> '.join(frase)
+
+    def expandir(self, query):
+        """
+        tsquery (sintaxis raw) con los sinónimos de la búsqueda, o None si
+        ninguna palabra tiene sinónimos. Cada palabra o frase reconocida se
+        reemplaza por el OR de sus equivalentes; el resto queda igual (AND).
+        """
+        data = self.get()
+        mapa = data['mapa']
+        tokens = palabras(query)
+        raices = [raiz(token) for token in tokens]
+        grupos = []
+        expandida = False
+        i = 0
+        while i < len(tokens):
+            for largo in range(min(data['largo_maximo'], len(tokens) - i), 0, -1):
+                frases = mapa.get(tuple(raices[i:i + largo]))
+                if frases:
+                    originales = tuple(tokens[i:i + largo])
+                    alternativas = [originales] + [frase for frase in frases if frase != originales]
+                    grupos.append('(' + ' | '.join(self._tsquery_frase(frase) for frase in alternativas) + ')')
+                    expandida = True
+                    i += largo
+                    break
+            else:
+                grupos.append(tokens[i])
+                i += 1
+        if not expandida:
+            return None
+        return ' & '.join(grupos)
+
+
+sinonimos_index = SynonymIndex()
@@ -0,0 +1,90 @@
+// Autocompletado del buscador del navbar
+document.addEventListener('DOMContentLoaded', () => {
+  const form = document.querySelector('.nav-right .search-form');
+  const input = form ? form.querySelector('input[name="q"]') : null;
+  if (!form || !input || !form.dataset.autocompletarUrl) return;
+
+  const lista = document.createElement('ul');
+  lista.className = 'search-sugerencias oculto';
+  form.appendChild(lista);
+
+  const respuestas = new Map(); // prefijo -> sugerencias (evita repetir peticiones)
+  let temporizador = null;
+  let controlador = null;
+  let seleccion = -1;
+
+  function normalizar(texto) {
+    return texto.normalize('NFKD').replace(/[\u0300-\u036f]/g, '').trim().toLowerCase().replace(/\s+/g, ' ');
+  }
+
+  function cerrar() {
+    lista.classList.add('oculto');
+    lista.innerHTML = '';
+    seleccion = -1;
+  }
+
+  function agregar(item, tipo) {
+    const li = document.createElement('li');
+    const a = document.createElement('a');
+    a.href = item.url;
+    a.textContent = item.nombre;
+    a.className = 'sugerencia-' + tipo;
+    li.appendChild(a);
+    lista.appendChild(li);
+  }
+
+  function mostrar(data) {
+    lista.innerHTML = '';
+    seleccion = -1;
+    data.categorias.forEach((item) => agregar(item, 'categoria'));
+    data.productos.forEach((item) => agregar(item, 'producto'));
+    lista.classList.toggle('oculto', !lista.children.length);
+  }
+
+  function pedir(prefijo) {
+    if (respuestas.has(prefijo)) {
+      mostrar(respuestas.get(prefijo));
+      return;
+    }
+    if (controlador) controlador.abort();
+    controlador = new AbortController();
+    fetch(form.dataset.autocompletarUrl + '?q=' + encodeURIComponent(prefijo), { signal: controlador.signal })
+      .then((r) => r.json())
+      .then((data) => {
+        respuestas.set(prefijo, data);
+        if (normalizar(input.value) === prefijo) mostrar(data);
+      })
+      .catch(() => {});
+  }
+
+  input.addEventListener('input', () => {
+    clearTimeout(temporizador);
+    const prefijo = normalizar(input.value);
+    if (!prefijo) {
+      cerrar();
+      return;
+    }
+    temporizador = setTimeout(() => pedir(prefijo), 120);
+  });
+
+  // Navegación con teclado dentro de las sugerencias
+  input.addEventListener('keydown', (e) => {
+    const enlaces = lista.querySelectorAll('a');
+    if (!enlaces.length) return;
+    if (e.key === 'ArrowDown' || e.key === 'ArrowUp') {
+      e.preventDefault();
+      const paso = e.key === 'ArrowDown' ? 1 : -1;
+      seleccion = (seleccion + 1 + paso + enlaces.length + 1) % (enlaces.length + 1) - 1;
+      enlaces.forEach((a, i) => a.classList.toggle('active', i === seleccion));
+    } else if (e.key === 'Enter' && seleccion >= 0) {
+      e.preventDefault();
+      window.location.href = enlaces[seleccion].href;
+    } else if (e.key === 'Escape') {
+      cerrar();
+    }
+  });
+
+  document.addEventListener('click', (e) => {
+    if (!form.contains(e.target)) cerrar();
+  });
+});
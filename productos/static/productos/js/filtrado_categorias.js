@@ -1,38 +1,120 @@
 document.addEventListener('DOMContentLoaded', () => {
-  const categorias = document.querySelectorAll('.categorias-list a');
+  const filtros = document.getElementById('productos-filtros');
   const gridContainer = document.getElementById('productos-grid-container');
-  if (!gridContainer || !categorias.length) return;
+  const btnCargarMas = document.getElementById('btn-cargar-mas');
+  if (!gridContainer) return;
 
-  function filtrarProductos(categoria) {
+  let categoriaActual = gridContainer.dataset.categoria || '';
+  let rangoActual = gridContainer.dataset.rango || '';
+  let ordenActual = gridContainer.dataset.orden || '';
+  let precioMin = gridContainer.dataset.precioMin || '';
+  let precioMax = gridContainer.dataset.precioMax || '';
+  let query = gridContainer.dataset.query || '';
+  let nextCursor = gridContainer.dataset.nextCursor || '';
+  let cargando = false;
+
+  function reinicializar(root) {
+    if (typeof initProductModals === 'function') initProductModals(root);
+    if (typeof initProductCardCarousel === 'function') initProductCardCarousel(root);
+    if (typeof initModalEvents === 'function') initModalEvents(root);
+    if (typeof initWishlistButtons === 'function') initWishlistButtons(root);
+  }
+
+  function actualizarCargarMas() {
+    if (btnCargarMas) btnCargarMas.classList.toggle('oculto', !nextCursor);
+  }
+
+  function pedirProductos(cursor) {
     const params = new URLSearchParams();
-    if (categoria) params.append('categoria', categoria);
-    fetch('/productos/filtrar/?' + params.toString(), { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
-      .then((r) => r.json())
+    if (categoriaActual) params.append('categoria', categoriaActual);
+    if (rangoActual) params.append('rango', rangoActual);
+    if (ordenActual) params.append('orden', ordenActual);
+    if (precioMin) params.append('precio_min', precioMin);
+    if (precioMax) params.append('precio_max', precioMax);
+    if (query) params.append('q', query);
+    if (cursor) params.append('cursor', cursor);
+    return fetch('/productos/filtrar/?' + params.toString(), { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+      .then((r) => r.json());
+  }
+
+  function filtrarProductos() {
+    pedirProductos()
       .then((data) => {
         if (!data || !data.html) return;
         gridContainer.innerHTML = data.html;
-        if (typeof initProductModals === 'function') initProductModals();
-        if (typeof initProductCardCarousel === 'function') initProductCardCarousel();
-        if (typeof initModalEvents === 'function') initModalEvents();
-        if (typeof initWishlistButtons === 'function') initWishlistButtons();
+        // La búsqueda puede volver corregida; las páginas siguientes la usan
+        query = data.query || '';
+        if (filtros && data.filtros) filtros.innerHTML = data.filtros;
+        nextCursor = data.next_cursor || '';
+        actualizarCargarMas();
+        reinicializar(gridContainer);
       })
       .catch(() => {});
   }
 
-  categorias.forEach((cat) => {
-    cat.addEventListener('click', (e) => {
+  // Scroll infinito: agrega la página siguiente al final del grid
+  function cargarMas() {
+    if (!nextCursor || cargando) return;
+    cargando = true;
+    pedirProductos(nextCursor)
+      .then((data) => {
+        if (!data || !data.html) return;
+        const grid = gridContainer.querySelector('.products-grid');
+        const tpl = document.createElement('template');
+        tpl.innerHTML = data.html.trim();
+        const pagina = tpl.content.firstElementChild;
+        if (grid && pagina) {
+          grid.appendChild(pagina);
+          reinicializar(pagina);
+        }
+        nextCursor = data.next_cursor || '';
+        actualizarCargarMas();
+      })
+      .catch(() => {})
+      .finally(() => { cargando = false; });
+  }
+
+  // Delegación: la barra de filtros se reemplaza en cada filtrado
+  if (filtros) {
+    filtros.addEventListener('click', (e) => {
+      const link = e.target.closest('a[data-categoria], a[data-rango]');
+      if (!link) return;
       e.preventDefault();
-      categorias.forEach((c) => c.classList.remove('active'));
-      cat.classList.add('active');
-      const categoriaActual = cat.dataset.categoria || '';
-      filtrarProductos(categoriaActual);
+      if (link.hasAttribute('data-categoria')) {
+        categoriaActual = link.dataset.categoria || '';
+      } else {
+        const rango = link.dataset.rango || '';
+        rangoActual = rangoActual === rango ? '' : rango;
+      }
+      filtrarProductos();
+    });
+    filtros.addEventListener('change', (e) => {
+      if (e.target.name !== 'orden') return;
+      ordenActual = e.target.value;
+      filtrarProductos();
     });
-  });
+    filtros.addEventListener('click', (e) => {
+      if (!e.target.closest('.btn-aplicar-precio')) return;
+      precioMin = filtros.querySelector('input[name="precio_min"]').value;
+      precioMax = filtros.querySelector('input[name="precio_max"]').value;
+      filtrarProductos();
+    });
+  }
+
+  if (btnCargarMas) {
+    btnCargarMas.addEventListener('click', cargarMas);
+    if ('IntersectionObserver' in window) {
+      const observer = new IntersectionObserver((entries) => {
+        if (entries.some((entry) => entry.isIntersecting)) cargarMas();
+      }, { rootMargin: '400px' });
+      observer.observe(btnCargarMas);
+    }
+  }
 });
 
 // Funciones para reinicializar scripts tras AJAX
-function initProductModals() {
-    document.querySelectorAll('.product-card.open-modal-btn').forEach(card => {
+function initProductModals(root = document) {
+    root.querySelectorAll('.product-card.open-modal-btn').forEach(card => {
         card.addEventListener('click', function(e) {
             if (e.target.closest('button')) return;
             const productId = this.getAttribute('data-product-id');
@@ -41,8 +123,8 @@ function initProductModals() {
     });
 }
 
-function initProductCardCarousel() {
-    document.querySelectorAll('.product-card .product-image').forEach(function(img) {
+function initProductCardCarousel(root = document) {
+    root.querySelectorAll('.product-card .product-image').forEach(function(img) {
         const images = JSON.parse(img.getAttribute('data-images'));
         let current = 0;
         const wrapper = img.closest('.product-image-wrapper');
@@ -84,8 +166,8 @@ function initProductCardCarousel() {
 }
 
 // Nueva función para reinicializar eventos de cierre de modales
-function initModalEvents() {
-    document.querySelectorAll('.product-modal').forEach(modal => {
+function initModalEvents(root = document) {
+    root.querySelectorAll('.product-modal').forEach(modal => {
         // Cerrar al hacer clic en el botón de cerrar
         const closeButton = modal.querySelector('.close-modal');
         if (closeButton) {
@@ -103,7 +185,9 @@ function initModalEvents() {
             }
         };
     });
-    // Cerrar modal con la tecla ESC
+    // Cerrar modal con la tecla ESC (un solo listener global)
+    if (initModalEvents.escRegistrado) return;
+    initModalEvents.escRegistrado = true;
     document.addEventListener('keydown', function(e) {
         if (e.key === 'Escape') {
             const activeModal = document.querySelector('.product-modal.active');
@@ -116,9 +200,9 @@ function initModalEvents() {
 }
 
 // Nueva función para reinicializar eventos de favoritos
-function initWishlistButtons() {
+function initWishlistButtons(root = document) {
     // Para tarjetas
-    document.querySelectorAll('.wishlist-btn').forEach(btn => {
+    root.querySelectorAll('.wishlist-btn').forEach(btn => {
         btn.onclick = async function(e) {
             e.stopPropagation();
             const id = btn.dataset.productId;
@@ -138,7 +222,7 @@ function initWishlistButtons() {
         }
     });
     // Para modales
-    document.querySelectorAll('.modal-wishlist-btn').forEach(btn => {
+    root.querySelectorAll('.modal-wishlist-btn').forEach(btn => {
         btn.onclick = async function(e) {
             e.stopPropagation();
             const id = btn.dataset.productId;
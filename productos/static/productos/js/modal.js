@@ -1,14 +1,94 @@
-    // Funciones del modal
+// Funciones del modal
+// Los modales se piden al servidor la primera vez que se abren y quedan en
+// el DOM; la promesa se guarda para no repetir la petición
+const modalesCargados = new Map();
+
+function cargarModalProducto(id) {
+    const existente = document.getElementById(`modal-${id}`);
+    if (existente) return Promise.resolve(existente);
+    if (!modalesCargados.has(id)) {
+        const promesa = fetch(`/productos/${id}/modal/`, {headers: {'X-Requested-With': 'XMLHttpRequest'}})
+            .then(res => {
+                if (!res.ok) throw new Error(`HTTP ${res.status}`);
+                return res.text();
+            })
+            .then(html => {
+                const tpl = document.createElement('template');
+                tpl.innerHTML = html.trim();
+                const modal = tpl.content.querySelector('.product-modal');
+                document.body.appendChild(modal);
+                initModalProducto(modal);
+                return modal;
+            })
+            .catch(err => {
+                modalesCargados.delete(id);
+                throw err;
+            });
+        modalesCargados.set(id, promesa);
+    }
+    return modalesCargados.get(id);
+}
+
 function openProductModal(id) {
-    console.log('Opening modal for product:', id);
-    const modal = document.getElementById(`modal-${id}`);
-    if (modal) {
-        modal.classList.add('active');
-        document.body.style.overflow = 'hidden';
-        console.log('Modal opened successfully');
-    } else {
-        console.error('Modal not found for product:', id);
+    cargarModalProducto(String(id))
+        .then(modal => {
+            modal.classList.add('active');
+            document.body.style.overflow = 'hidden';
+        })
+        .catch(err => console.error('Modal not found for product:', id, err));
+}
+
+// Eventos de un modal cargado: cerrar, favoritos y carrusel de imágenes
+function initModalProducto(modal) {
+    const productId = modal.id.split('-')[1];
+    const closeButton = modal.querySelector('.close-modal');
+    if (closeButton) {
+        closeButton.addEventListener('click', (e) => {
+            e.stopPropagation();
+            closeProductModal(productId);
+        });
     }
+    modal.addEventListener('click', (e) => {
+        if (e.target === modal) closeProductModal(productId);
+    });
+
+    const wishlistBtn = modal.querySelector('.modal-wishlist-btn');
+    if (wishlistBtn) {
+        wishlistBtn.addEventListener('click', async e => {
+            e.stopPropagation();
+            const res = await fetch(`/productos/wishlist/toggle/${productId}/`, {
+                method: 'POST',
+                headers: {'X-CSRFToken': getCookie('csrftoken')}
+            });
+            const data = await res.json();
+            document.querySelectorAll(`.modal-wishlist-btn[data-product-id="${productId}"]`).forEach(b => toggleWishlistButton(b, data.added));
+            document.querySelectorAll(`.wishlist-btn[data-product-id="${productId}"]`).forEach(b => toggleWishlistButton(b, data.added));
+            await updateWishlistMenu();
+        });
+    }
+
+    const img = modal.querySelector('.modal-product-image');
+    const dots = modal.querySelector('.modal-image-dots');
+    let images = [];
+    try { images = JSON.parse(img ? img.dataset.images : '[]'); } catch (e) { images = []; }
+    if (!img || !dots || images.length < 2) return;
+    let current = 0;
+    function mostrar(i) {
+        current = (i + images.length) % images.length;
+        img.src = images[current].url;
+        img.dataset.currentImage = current;
+        dots.querySelectorAll('.dot').forEach((dot, j) => dot.classList.toggle('active', j === current));
+    }
+    images.forEach((_, i) => {
+        const dot = document.createElement('span');
+        dot.className = 'dot' + (i === 0 ? ' active' : '');
+        dot.addEventListener('click', (e) => { e.stopPropagation(); mostrar(i); });
+        dots.appendChild(dot);
+    });
+    const prev = modal.querySelector('.prev-arrow');
+    const next = modal.querySelector('.next-arrow');
+    if (prev) prev.addEventListener('click', (e) => { e.stopPropagation(); mostrar(current - 1); });
+    if (next) next.addEventListener('click', (e) => { e.stopPropagation(); mostrar(current + 1); });
 }
 
 function closeProductModal(id) {
@@ -0,0 +1,83 @@
+from django import template
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from productos.services.image_service import ImageService
+
+register = template.Library()
+
+TIMEOUT_TARJETA = 60 * 60 * 24
+# Marcas que la tarjeta cacheada lleva en lugar del estado de favoritos
+MARCA_ACTIVO = '__wishlist_activo__'
+MARCA_ICONO = '__wishlist_icono__'
+
+
+def _tarjeta_key(producto):
+    return f'productos:tarjeta:{producto.id}:{producto.fecha_actualizacion.timestamp()}'
+
+
+@register.simple_tag
+def tarjetas_productos(productos, wishlist_ids=None):
+    """
+    Renderiza las tarjetas de los productos reutilizando el HTML cacheado
+    de cada una (una sola lectura a la cache para todo el grid). La parte
+    que depende del usuario, el botón de favoritos, se aplica encima.
+    """
+    productos = list(productos)
+    wishlist_ids = set(wishlist_ids or ())
+    keys = {producto.id: _tarjeta_key(producto) for producto in productos}
+    cacheadas = cache.get_many(keys.values())
+    # Imágenes reducidas de las tarjetas que hay que renderizar, en una lectura
+    faltantes = [producto for producto in productos if keys[producto.id] not in cacheadas]
+    variantes = ImageService.variantes_many(
+        img['imagen'].name for producto in faltantes for img in producto.imagenes_list
+    )
+    nuevas = {}
+    partes = []
+    for producto in productos:
+        key = keys[producto.id]
+        html = cacheadas.get(key)
+        if html is None:
+            html = render_to_string('productos/tarjeta_producto.html', {
+                'producto': producto,
+                'variantes': variantes,
+                'imagenes_json': producto.json_imagenes(640, variantes),
+                'wishlist_activo': MARCA_ACTIVO,
+                'wishlist_icono': MARCA_ICONO,
+            })
+            nuevas[key] = html
+        en_wishlist = producto.id in wishlist_ids
+        partes.append(
+            html.replace(MARCA_ACTIVO, ' active' if en_wishlist else '')
+            .replace(MARCA_ICONO, 's' if en_wishlist else 'r')
+        )
+    if nuevas:
+        cache.set_many(nuevas, TIMEOUT_TARJETA)
+    return mark_safe(''.join(partes))
+
+
+def _variantes(imagen, variantes):
+    """
+    las de `imagen` en el dict ya consultado (variantes_many), o None para
+    consultarlas (la plantilla no tiene el dict: llega '')
+    """
+    if not variantes or not imagen:
+        return None
+    return variantes.get(imagen.name)
+
+
+@register.simple_tag
+def srcset(imagen, variantes=None, formato='webp'):
+    """
+    srcset con las versiones reducidas de la imagen ('' si no tiene).
+    `variantes`: el dict de ImageService.variantes_many de la página, para
+    no consultar la cache imagen por imagen
+    """
+    return ImageService.srcset(imagen, formato, _variantes(imagen, variantes))
+
+
+@register.simple_tag
+def miniatura(imagen, ancho, variantes=None):
+    """URL de la versión reducida que cubre `ancho` px (o la original); `variantes` como en srcset"""
+    return ImageService.miniatura(imagen, int(ancho), _variantes(imagen, variantes))
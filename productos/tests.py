@@ -1,3 +1,47 @@
 from django.test import TestCase
 
-# Create your tests here.
+from productos.models import Categoria, Producto
+from productos.services.facet_service import FacetService
+from productos.services.pagination_service import KeysetPaginator
+from productos.services.search_service import SearchService
+
+
+class PaginacionRelevanciaTests(TestCase):
+    def test_empates_de_rank_entre_paginas(self):
+        categoria = Categoria.objects.create(nombre='Sillas', slug='sillas')
+        # Mismo nombre: mismo rank; el orden lo decide ventas y luego id
+        for ventas in (5, 5, 3, 3, 3, 1, 0):
+            Producto.objects.create(nombre='Silla nórdica', categoria=categoria, precio=100, ventas=ventas)
+        SearchService.actualizar_vectores()
+
+        resultados = SearchService.buscar(Producto.objects.all(), 'silla')
+        esperados = list(resultados.values_list('id', flat=True))
+        paginator = KeysetPaginator(resultados, resultados.query.order_by, page_size=2)
+
+        vistos = []
+        cursor = None
+        while True:
+            pagina, cursor = paginator.page(cursor)
+            vistos.extend(producto.id for producto in pagina)
+            if cursor is None:
+                break
+        self.assertEqual(vistos, esperados)
+        self.assertEqual(len(esperados), 7)
+
+
+class FacetasPrecioTests(TestCase):
+    def test_precio_minimo_y_maximo_en_categorias_y_ofertas(self):
+        sillas = Categoria.objects.create(nombre='Sillas', slug='sillas')
+        mesas = Categoria.objects.create(nombre='Mesas', slug='mesas')
+        Producto.objects.create(nombre='Silla', categoria=sillas, precio=1000)
+        Producto.objects.create(nombre='Silla alta', categoria=sillas, precio=3000, oferta_activa=True, precio_oferta=2500)
+        Producto.objects.create(nombre='Mesa', categoria=mesas, precio=8000, oferta_activa=True, precio_oferta=7000)
+
+        facetas = FacetService.resumen(
+            FacetService.calcular(precio_max=3000), tabla_rangos=FacetService.calcular(),
+        )
+        self.assertEqual(facetas['categorias'], {sillas.id: 2})  # sin fila: 0
+        self.assertEqual(facetas['total'], 2)
+        self.assertEqual(facetas['ofertas'], 1)
+        # Los rangos de precio no se filtran por el precio mínimo/máximo
+        self.assertEqual([rango['conteo'] for rango in facetas['rangos']], [1, 1, 1, 0])
@@ -7,8 +7,11 @@ app_name = 'productos'
 urlpatterns = [
     path('', views.lista_productos, name='lista_productos'),
     path('filtrar/', views.filtrado_productos_ajax, name='filtrado_productos_ajax'),
+    path('autocompletar/', views.autocompletar_productos, name='autocompletar_productos'),
+    path('estadisticas-cache/', views.estadisticas_cache, name='estadisticas_cache'),
     path('categoria/<slug:categoria_slug>/', views.lista_productos, name='lista_por_categoria'),
     path('<int:producto_id>/', views.detalle_producto, name='detalle_producto'),
+    path('<int:producto_id>/modal/', views.modal_producto, name='modal_producto'),
     path('carrito/', views.ver_carrito, name='ver_carrito'),
     path('carrito/seleccionar-direccion/', views.seleccionar_direccion, name='seleccionar_direccion'),
     path('carrito/agregar-direccion/', views.agregar_direccion, name='agregar_direccion'),
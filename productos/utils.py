@@ -5,6 +5,18 @@ Contiene funciones auxiliares que se utilizan en múltiples vistas.
 
 from .models import Wishlist, Carrito, ItemCarrito
 from django.db.models import Sum
+import unicodedata
+
+
+def normalizar_texto(text):
+    """
+    Normaliza un texto para búsquedas: quita acentos, espacios extremos y
+    pasa a minúsculas ("Sillón " -> "sillon").
+    """
+    if not isinstance(text, str):
+        return ''
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+    return text.strip().lower()
 
 
 def get_wishlist_ids(user):
@@ -39,31 +51,3 @@ def get_product_stock(producto):
 def get_cart_total_items(carrito):
     """total de items en el carrito"""
     return ItemCarrito.objects.filter(carrito=carrito).aggregate(total=Sum('cantidad'))['total'] or 0
-
-
-def prepare_product_images(producto):
-    """prepara imagenes del producto"""
-    imagenes_secundarias = list(producto.imagenes)
-    imagenes = []
-    if producto.imagen_principal:
-        imagenes.append({'imagen': producto.imagen_principal})
-    for img in imagenes_secundarias:
-        if not producto.imagen_principal or img.imagen.url != producto.imagen_principal.url:
-            imagenes.append({'imagen': img.imagen})
-    return imagenes 
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
@@ -4,25 +4,39 @@ Vistas de productos
 
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.http import JsonResponse, HttpResponse
 from django.views.decorators.http import require_POST, require_GET
 from django.template.loader import render_to_string
-from django.db.models import Q
 from django.db import transaction
-import unicodedata
-from django.utils import timezone
+from django.db.models import F
+from django.db.models.functions import Greatest
 import mercadopago
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.cache import cache_control
 from django.conf import settings
 import json
+from decimal import Decimal, InvalidOperation
 from django.urls import reverse
 from productos.services.pdf_service import PDFService
 from productos.services.email_service import EmailService
-
-from .models import Producto, Categoria, Wishlist, Carrito, ItemCarrito, BannerPromocional, Pedido, DetallePedido, ResumenPedido
-from .utils import get_wishlist_ids, get_product_stock, get_cart_total_items, prepare_product_images
+from productos.services.search_service import SearchService
+from productos.services.category_service import category_matcher
+from productos.services.facet_service import FacetService
+from productos.services.autocomplete_service import autocomplete_index
+from productos.services.fuzzy_service import fuzzy_index
+from productos.services.result_cache_service import ResultCacheService
+from productos.services.catalog_service import catalogo_snapshot
+from productos.services.home_service import HomeService
+from productos.services.leaderboard_service import LeaderboardService
+from productos.services.recommendation_service import RecommendationService
+from productos.services.cache_service import CacheService
+from productos.services.download_service import DownloadService
+from productos.services.image_service import ImageService
+
+from .models import Producto, Categoria, Inventario, Wishlist, Carrito, ItemCarrito, Pedido, DetallePedido, ResumenPedido
+from .utils import get_wishlist_ids, get_product_stock, get_cart_total_items, normalizar_texto
 from .mixins import WishlistMixin, CartMixin, ProductMixin
-from blog.models import Blog
 from usuarios.models import DireccionUsuario
 from suscripciones.forms import SuscripcionForm
 
@@ -32,6 +46,18 @@ wishlist_mixin = WishlistMixin()
 cart_mixin = CartMixin()
 product_mixin = ProductMixin()
 
+# Paginación por cursor del listado: orden estable (el id desempata)
+PRODUCTOS_POR_PAGINA = 24
+ORDEN_LISTADO = ('-ventas', '-fecha_creacion', '-id')
+ORDEN_RELEVANCIA = ('-rank',) + ORDEN_LISTADO
+# Productos en la franja "más vendidos" del listado de una categoría
+PRODUCTOS_MAS_VENDIDOS = 4
+# Orden por precio sobre la columna indexada precio_efectivo
+ORDENES_PRECIO = {
+    'precio_asc': ('precio_efectivo', 'id'),
+    'precio_desc': ('-precio_efectivo', '-id'),
+}
+
 
 def home(request):
     """
@@ -53,43 +79,9 @@ def home(request):
     else:
         form_suscripcion = SuscripcionForm()
 
-    # Obtener productos para el carrusel (3 productos aleatorios)
-    productos_aleatorios = list(Producto.objects.filter(activo=True).order_by('?')[:3])
-    
-    # Preparar imágenes para cada producto del carrusel
-    for producto in productos_aleatorios:
-        producto.imagenes_list = prepare_product_images(producto)
-    
-    # Obtener productos para el grid (8 productos, excluyendo los del carrusel)
-    productos_carrusel_ids = [p.id for p in productos_aleatorios]
-    productos_grid = list(Producto.objects.filter(
-        activo=True
-    ).exclude(
-        id__in=productos_carrusel_ids
-    ).order_by('-ventas', '-fecha_creacion')[:8])
-
-    # Obtener top 6 productos por ventas
-    top_productos = list(Producto.objects.filter(activo=True).order_by('-ventas', '-fecha_creacion')[:6])
-    if all(p.ventas == 0 for p in top_productos):
-        # Si todos tienen 0 ventas, mostrar 6 aleatorios
-        top_productos = list(Producto.objects.filter(activo=True).order_by('?')[:6])
-    
-    banner = BannerPromocional.objects.filter(
-        activo=True,
-        fecha_inicio__lte=timezone.now(),
-        fecha_fin__gte=timezone.now()
-    ).order_by('-fecha_inicio').first()
-    banner_productos_carrusel = banner.productos_carrusel.all() if banner else []
-    
-    blogs_recientes = Blog.objects.order_by('-fecha_creacion')[:2]
-    
+    # Productos, banner y blogs salen de la cache por secciones
     context = {
-        'productos_carrusel': productos_aleatorios,
-        'productos_grid': productos_grid,
-        'top_productos': top_productos,
-        'banner': banner,
-        'banner_productos_carrusel': banner_productos_carrusel,
-        'blogs_recientes': blogs_recientes,
+        **HomeService.obtener(),
         'form_suscripcion': form_suscripcion,
         'mensaje_suscripcion': mensaje_suscripcion,
         'mensaje_tipo': mensaje_tipo,
@@ -97,68 +89,182 @@ def home(request):
     return render(request, 'inicio.html', context)
 
 
+def _registrar_detalles_pedido(pedido, items):
+    """
+    Crea los detalles del pedido, descuenta el stock y suma las ventas de
+    cada producto del carrito. Stock y ventas se actualizan en la base de
+    datos (F) para no pisar compras simultáneas. Llamar dentro de la
+    transacción del pedido.
+    """
+    vendidos = {}
+    for item in items:
+        DetallePedido.objects.create(
+            pedido=pedido,
+            producto=item.producto,
+            cantidad=item.cantidad,
+            precio_unitario=item.precio_unitario,
+            subtotal=item.cantidad * item.precio_unitario
+        )
+        vendidos[item.producto_id] = vendidos.get(item.producto_id, 0) + item.cantidad
+    for producto_id, cantidad in vendidos.items():
+        Inventario.objects.filter(producto_id=producto_id).update(stock=Greatest(F('stock') - cantidad, 0))
+        Producto.objects.filter(pk=producto_id).update(ventas=F('ventas') + cantidad)
+    # update() no envía señales: avisar a lo que ordena por ventas. Solo la
+    # versión 'ventas' (el catálogo no cambió) y el stock no se cachea
+    CacheService.bump_version('ventas')
+    LeaderboardService.registrar_ventas(vendidos)
+
+
+def _parametros_listado(request):
+    """
+    Filtros de precio y orden del listado tomados de GET
+    """
+    def _precio(nombre):
+        try:
+            valor = Decimal(request.GET.get(nombre, ''))
+        except InvalidOperation:
+            return None
+        return valor if valor.is_finite() and valor >= 0 else None
+
+    orden = request.GET.get('orden')
+    return {
+        'rango': request.GET.get('rango'),
+        'orden': orden if orden in ORDENES_PRECIO else None,
+        'precio_min': _precio('precio_min'),
+        'precio_max': _precio('precio_max'),
+    }
+
+
+def _filtrar_productos(categoria_slug, query, rango=None, orden=None, precio_min=None, precio_max=None):
+    """
+    Aplica los filtros de categoría/ofertas, precio y búsqueda.
+    Devuelve el queryset y el orden estable con el que se pagina.
+    """
+    productos = Producto.objects.para_grid().filter(activo=True)
+    if categoria_slug == 'ofertas':
+        productos = productos.filter(oferta_activa=True)
+    elif categoria_slug:
+        categoria = get_object_or_404(Categoria, slug=categoria_slug)
+        productos = productos.filter(categoria=categoria)
+    filtro_rango = FacetService.filtro_rango(rango)
+    if filtro_rango is not None:
+        productos = productos.filter(filtro_rango)
+    if precio_min is not None:
+        productos = productos.filter(precio_efectivo__gte=precio_min)
+    if precio_max is not None:
+        productos = productos.filter(precio_efectivo__lte=precio_max)
+    if orden in ORDENES_PRECIO:
+        if query:
+            productos = SearchService.filtrar(productos, query)
+        return productos, ORDENES_PRECIO[orden]
+    if query:
+        # Búsqueda full-text (nombre, categoría y descripción) ordenada por relevancia
+        return SearchService.buscar(productos, query), ORDEN_RELEVANCIA
+    return productos, ORDEN_LISTADO
+
+
+def _pagina_productos(categoria_slug, query, parametros, cursor=None):
+    """
+    Página del listado. Sin búsqueda de texto se sirve desde la copia del
+    catálogo en memoria; con búsqueda, desde la cache de resultados si
+    está. Si la búsqueda no encuentra nada se reintenta con la búsqueda
+    corregida (errores de tipeo). Devuelve los productos, el cursor de la
+    página siguiente y la búsqueda que se usó.
+    """
+    def _pagina(termino, cursor):
+        if not normalizar_texto(termino):
+            orden = ORDENES_PRECIO.get(parametros['orden'], ORDEN_LISTADO)
+            resultado = catalogo_snapshot.pagina(categoria_slug, parametros, orden, PRODUCTOS_POR_PAGINA, cursor)
+            if resultado is not None:
+                ids, siguiente = resultado
+                return Producto.objects.para_grid().en_orden(ids), siguiente
+        productos, orden = _filtrar_productos(categoria_slug, termino, **parametros)
+        clave = ResultCacheService.clave(termino, categoria_slug, parametros)
+        return ResultCacheService.pagina(productos, orden, PRODUCTOS_POR_PAGINA, cursor, clave)
+
+    pagina, next_cursor = _pagina(query, cursor)
+    if not pagina and query and not cursor:
+        corregida = fuzzy_index.corregir(query)
+        if corregida:
+            pagina, next_cursor = _pagina(corregida, None)
+            if pagina:
+                query = corregida
+    return pagina, next_cursor, query
+
+
+def _contexto_filtros(categoria_slug, query, rango=None, orden=None, precio_min=None, precio_max=None):
+    """
+    Categorías con sus conteos y facetas de la barra de filtros
+    """
+    categorias = list(Categoria.objects.all())
+    categoria_id = next((cat.id for cat in categorias if cat.slug == categoria_slug), None)
+    # Categorías y ofertas se cuentan con el precio mínimo/máximo; los rangos no
+    tabla = FacetService.obtener(query, precio_min, precio_max)
+    sin_precio = tabla if precio_min is None and precio_max is None else FacetService.obtener(query)
+    facetas = FacetService.resumen(
+        tabla,
+        categoria_id=categoria_id,
+        ofertas=categoria_slug == 'ofertas',
+        rango=rango,
+        tabla_rangos=sin_precio,
+    )
+    for cat in categorias:
+        cat.conteo = facetas['categorias'].get(cat.id, 0)
+    return {
+        'categorias': categorias,
+        'facetas': facetas,
+        'categoria_actual': categoria_slug,
+        'rango_actual': rango,
+        'orden_actual': orden,
+        'precio_min': precio_min,
+        'precio_max': precio_max,
+    }
+
+
 def lista_productos(request, categoria_slug=None):
     """
     Vista para listar productos con filtros por categoría y búsqueda.
+    Muestra la primera página; las siguientes se piden por cursor.
     """
     # Si no viene en los parámetros de URL, intentar obtenerlo de GET
     if categoria_slug is None:
         categoria_slug = request.GET.get('categoria')
     
     query = request.GET.get('q')
-    productos = Producto.objects.filter(activo=True).select_related('categoria')
-    categorias = Categoria.objects.all()
+    parametros = _parametros_listado(request)
     
-    # Aplicar filtros
-    if categoria_slug == 'ofertas':
-        productos = productos.filter(oferta_activa=True)
-    elif categoria_slug:
-        categoria = get_object_or_404(Categoria, slug=categoria_slug)
-        productos = productos.filter(categoria=categoria)
-    
-    # Búsqueda por nombre y también por nombre de categoría. Si el término
-    # coincide claramente con una categoría, redirigir a esa categoría.
-    if query:
-        def _normalize(text: str) -> str:
-            if not isinstance(text, str):
-                return ''
-            text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
-            return text.strip().lower()
-
-        norm_q = _normalize(query)
-
-        # Intentar detectar categoría si no se pasó categoria_slug explícito
-        if not categoria_slug:
-            matched_cat = None
-            for cat in categorias:
-                name = _normalize(cat.nombre)
-                slug = _normalize(cat.slug)
-                # Coincidencia directa o contenida (p.ej. "camas en general")
-                if (
-                    norm_q == name or
-                    norm_q == slug or
-                    name in norm_q or
-                    norm_q in name
-                ):
-                    matched_cat = cat
-                    break
-            if matched_cat:
-                return redirect('productos:lista_por_categoria', categoria_slug=matched_cat.slug)
-
-        # Filtro OR: por nombre de producto o por nombre de categoría
-        productos = productos.filter(
-            Q(nombre__icontains=query) |
-            Q(categoria__nombre__icontains=query)
-        )
+    # Si el término coincide claramente con una categoría, redirigir a esa
+    # categoría (coincidencia directa o contenida, p.ej. "camas en general")
+    if query and not categoria_slug:
+        matched_cat = category_matcher.detectar(query)
+        if matched_cat:
+            return redirect('productos:lista_por_categoria', categoria_slug=matched_cat[0])
+
+    productos, next_cursor, query_usada = _pagina_productos(
+        categoria_slug, query, parametros, request.GET.get('cursor'),
+    )
+
+    filtros = _contexto_filtros(categoria_slug, query_usada, **parametros)
+
+    # Más vendidos de la categoría, del ranking por categoría (no ordena Producto)
+    mas_vendidos = []
+    categoria = next((cat for cat in filtros['categorias'] if cat.slug == categoria_slug), None)
+    if categoria is not None and not query_usada:
+        ids = LeaderboardService.top(PRODUCTOS_MAS_VENDIDOS, categoria.id)
+        mas_vendidos = [p for p in Producto.objects.para_grid().en_orden(ids) if p.ventas > 0]
 
     # Obtener contexto de wishlist
     wishlist_context = wishlist_mixin.get_wishlist_context(request.user)
 
     return render(request, 'productos/lista_productos.html', {
         'productos': productos,
-        'categorias': categorias,
-        'categoria_actual': categoria_slug,
-        'query': query,
+        'next_cursor': next_cursor,
+        'query': query_usada,
+        'query_original': query if query_usada != query else None,
+        'mas_vendidos': mas_vendidos,
+        'variantes': ImageService.variantes_productos(mas_vendidos),
+        'titulo_mas_vendidos': f'Más vendidos en {categoria.nombre}' if categoria else '',
+        **filtros,
         **wishlist_context,
     })
 
@@ -170,15 +276,37 @@ def detalle_producto(request, producto_id):
     """
     producto, imagenes = product_mixin.get_product_with_images(producto_id)
     stock = get_product_stock(producto)
-    
+    recomendados = RecommendationService.para_productos([producto.id])
+    # Versiones reducidas de todas las imágenes de la página en una consulta
+    nombres = [producto.imagen_principal.name, *(img['imagen'].name for img in imagenes)]
+    nombres += [p.imagen_principal.name for p in recomendados]
+
     return render(request, 'productos/detalle_producto.html', {
         'producto': producto,
         'imagenes': imagenes,
         'stock': stock,
+        'recomendados': recomendados,
+        'variantes': ImageService.variantes_many(nombres),
         'mensaje': 'Detalle del producto',
     })
 
 
+@require_GET
+def modal_producto(request, producto_id):
+    """
+    HTML del modal de un producto, pedido al abrirlo (los listados ya no
+    incluyen un modal por producto)
+    """
+    producto = get_object_or_404(Producto.objects.para_grid(), pk=producto_id, activo=True)
+    guardados_juntos = RecommendationService.para_productos([producto.id], limite=3, campo='guardados_juntos')
+    return render(request, 'forms/modal_base.html', {
+        'producto': producto,
+        'guardados_juntos': guardados_juntos,
+        'variantes': ImageService.variantes_productos([producto, *guardados_juntos]),
+        **wishlist_mixin.get_wishlist_context(request.user),
+    })
+
+
 @login_required
 def ver_carrito(request):
     """
@@ -192,9 +320,12 @@ def ver_carrito(request):
         for item in items:
             item.subtotal = item.cantidad * item.precio_unitario
         total = sum(item.subtotal for item in items)
+    recomendados = RecommendationService.para_productos([item.producto_id for item in items])
     return render(request, 'productos/ver_carrito.html', {
         'items': items,
         'total': total,
+        'recomendados': recomendados,
+        'variantes': ImageService.variantes_productos([*(item.producto for item in items), *recomendados]),
     })
 
 
@@ -223,7 +354,14 @@ def ver_favoritos(request):
     Vista para mostrar todos los productos en la wishlist del usuario.
     """
     wishlist, _ = Wishlist.objects.get_or_create(usuario=request.user)
-    return render(request, 'productos/favoritos.html', {'wishlist': wishlist})
+    guardados = list(wishlist.productos.values_list('id', 'imagen_principal'))
+    recomendados = RecommendationService.para_productos([pk for pk, _ in guardados], campo='guardados_juntos')
+    nombres = [imagen for _, imagen in guardados] + [p.imagen_principal.name for p in recomendados]
+    return render(request, 'productos/favoritos.html', {
+        'wishlist': wishlist,
+        'recomendados': recomendados,
+        'variantes': ImageService.variantes_many(nombres),
+    })
 
 
 @require_GET
@@ -235,7 +373,12 @@ def wishlist_menu_ajax(request):
         return HttpResponse('<div class="wishlist-empty">No tienes favoritos aún.</div>')
     
     wishlist, _ = Wishlist.objects.get_or_create(usuario=request.user)
-    html = render_to_string('productos/partials/wishlist_menu.html', {'wishlist_menu': wishlist})
+    html = render_to_string('productos/partials/wishlist_menu.html', {
+        'wishlist_menu': wishlist,
+        'variantes_wishlist': ImageService.variantes_many(
+            wishlist.productos.values_list('imagen_principal', flat=True)
+        ),
+    })
     return HttpResponse(html)
 
 
@@ -279,7 +422,8 @@ def carrito_menu_ajax(request):
     html = render_to_string('productos/partials/carrito_menu.html', {
         'carrito': carrito, 
         'items': items, 
-        'subtotal': subtotal
+        'subtotal': subtotal,
+        'variantes': ImageService.variantes_productos(item.producto for item in items),
     })
     return HttpResponse(html)
 
@@ -348,23 +492,59 @@ def wishlist_menu_context(request):
 
 @require_GET
 def filtrado_productos_ajax(request):
+    """
+    Vista AJAX del listado. Sin cursor devuelve el grid completo de la primera
+    página; con cursor solo las tarjetas de la página siguiente (scroll infinito).
+    """
     categoria_slug = request.GET.get('categoria')
     query = request.GET.get('q')
-    productos = Producto.objects.filter(activo=True)
-    if categoria_slug == 'ofertas':
-        productos = productos.filter(oferta_activa=True)
-    elif categoria_slug:
-        categoria = get_object_or_404(Categoria, slug=categoria_slug)
-        productos = productos.filter(categoria=categoria)
-    if query:
-        productos = productos.filter(nombre__icontains=query)
-    categorias = Categoria.objects.all()
+    parametros = _parametros_listado(request)
+    cursor = request.GET.get('cursor')
+    productos, next_cursor, query = _pagina_productos(categoria_slug, query, parametros, cursor)
     wishlist_context = wishlist_mixin.get_wishlist_context(request.user)
-    html = render_to_string('productos/partials/grid_productos.html', {
+    template = 'productos/partials/tarjetas_productos.html' if cursor else 'productos/partials/grid_productos.html'
+    html = render_to_string(template, {
         'productos': productos,
+        'next_cursor': next_cursor,
         'wishlist_ids': wishlist_context.get('wishlist_ids', []),
     }, request=request)
-    return JsonResponse({'html': html})
+    data = {'html': html, 'next_cursor': next_cursor, 'query': query or ''}
+    if not cursor:
+        # Los conteos de los filtros cambian con la selección
+        data['filtros'] = render_to_string(
+            'productos/partials/filtros_productos.html',
+            _contexto_filtros(categoria_slug, query, **parametros),
+            request=request,
+        )
+    return JsonResponse(data)
+
+
+@require_GET
+@cache_control(public=True, max_age=120)
+def autocompletar_productos(request):
+    """
+    Sugerencias del buscador mientras se escribe (índice en memoria, sin
+    consultas a la base de datos). Es igual para todos los usuarios, así
+    que el navegador y los proxies pueden reutilizar la respuesta.
+    """
+    query = request.GET.get('q', '')[:100]
+    return JsonResponse(autocomplete_index.sugerir(query))
+
+
+@staff_member_required
+def estadisticas_cache(request):
+    """
+    Aciertos y fallos de la cache de resultados del listado (solo staff)
+    """
+    contadores = CacheService.get_contadores('resultados:aciertos', 'resultados:fallos')
+    total = contadores['resultados:aciertos'] + contadores['resultados:fallos']
+    return JsonResponse({
+        'resultados': {
+            'aciertos': contadores['resultados:aciertos'],
+            'fallos': contadores['resultados:fallos'],
+            'tasa_aciertos': round(contadores['resultados:aciertos'] / total, 4) if total else None,
+        },
+    })
 
 
 @login_required
@@ -550,22 +730,8 @@ def crear_pedido_desde_carrito(request):
                 estado='pendiente'
             )
 
-            # Crear detalles del pedido y descontar stock
-            for item in items:
-                DetallePedido.objects.create(
-                    pedido=pedido,
-                    producto=item.producto,
-                    cantidad=item.cantidad,
-                    precio_unitario=item.precio_unitario,
-                    subtotal=item.cantidad * item.precio_unitario
-                )
-                inventario = getattr(item.producto, 'inventario', None)
-                if inventario:
-                    inventario.stock = max(0, inventario.stock - item.cantidad)
-                    inventario.save(update_fields=['stock'])
-                # Actualizar ventas del producto
-                item.producto.ventas = (item.producto.ventas or 0) + item.cantidad
-                item.producto.save(update_fields=['ventas'])
+            # Crear detalles del pedido, descontar stock y sumar ventas
+            _registrar_detalles_pedido(pedido, items)
 
             # Crear resumen del pedido
             resumen = ResumenPedido.objects.create(
@@ -605,7 +771,10 @@ def detalle_pedido(request, pedido_id):
     """
     pedido = get_object_or_404(Pedido, id=pedido_id, usuario=request.user)
     return render(request, 'productos/detalle_pedido.html', {
-        'pedido': pedido
+        'pedido': pedido,
+        'variantes': ImageService.variantes_many(
+            pedido.detalles.values_list('producto__imagen_principal', flat=True)
+        ),
     })
 
 @login_required
@@ -616,9 +785,13 @@ def descargar_resumen_pdf(request, resumen_id):
     resumen = get_object_or_404(ResumenPedido, id=resumen_id, pedido__usuario=request.user)
     
     if resumen.archivo_pdf:
-        response = HttpResponse(resumen.archivo_pdf, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="resumen_pedido_{resumen.pedido.numero_pedido}.pdf"'
-        return response
+        # Por partes y con Range / ETag (o redirección a una URL firmada en Azure)
+        return DownloadService.respuesta(
+            request,
+            resumen.archivo_pdf,
+            f'resumen_pedido_{resumen.pedido.numero_pedido}.pdf',
+            'application/pdf',
+        )
     else:
         return JsonResponse({"error": "PDF no encontrado"}, status=404)
 
@@ -728,21 +901,8 @@ def pago_exitoso(request):
                                 estado='procesando'
                             )
 
-                            # Crear detalles y descontar stock
-                            for item in items:
-                                DetallePedido.objects.create(
-                                    pedido=pedido,
-                                    producto=item.producto,
-                                    cantidad=item.cantidad,
-                                    precio_unitario=item.precio_unitario,
-                                    subtotal=item.cantidad * item.precio_unitario
-                                )
-                                inventario = getattr(item.producto, 'inventario', None)
-                                if inventario:
-                                    inventario.stock = max(0, inventario.stock - item.cantidad)
-                                    inventario.save(update_fields=['stock'])
-                                item.producto.ventas = (item.producto.ventas or 0) + item.cantidad
-                                item.producto.save(update_fields=['ventas'])
+                            # Crear detalles, descontar stock y sumar ventas
+                            _registrar_detalles_pedido(pedido, items)
 
                             # Limpiar carrito
                             carrito.productos.clear()
@@ -869,20 +1029,7 @@ def pago_prueba(request):
                 estado='procesando',
                 estado_pago='aprobado',
             )
-            for item in items:
-                DetallePedido.objects.create(
-                    pedido=pedido,
-                    producto=item.producto,
-                    cantidad=item.cantidad,
-                    precio_unitario=item.precio_unitario,
-                    subtotal=item.cantidad * item.precio_unitario
-                )
-                inventario = getattr(item.producto, 'inventario', None)
-                if inventario:
-                    inventario.stock = max(0, inventario.stock - item.cantidad)
-                    inventario.save(update_fields=['stock'])
-                item.producto.ventas = (item.producto.ventas or 0) + item.cantidad
-                item.producto.save(update_fields=['ventas'])
+            _registrar_detalles_pedido(pedido, items)
         # El ResumenPedido se crea por señal post_save de Pedido
         resumen = getattr(pedido, 'resumen', None)
         if resumen: